@@ -1,11 +1,20 @@
 from __future__ import annotations
-from typing import Optional
-from a2_support import UserInterface, TextInterface
+import copy
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+from collections import OrderedDict, deque
+from typing import NamedTuple, Optional
+from a2_support import UserInterface, TextInterface, ViewportTextInterface
 from constants import *
 
 
 class Tile:
     """ An abstract class providing base functionality for tiles on a maze. """
+    __slots__ = ()
     _id = ABSTRACT_TILE
 
     def is_blocking(self) -> bool:
@@ -34,12 +43,14 @@ class Empty(Tile):
     """ A tile representing an empty square. Players can pass over an empty tile
         with no damage.
     """
+    __slots__ = ()
     _id = EMPTY
 
 class Lava(Tile):
     """ A tile representing a square filled with lava. A player can step on lava
         but it causes some damage.
     """
+    __slots__ = ()
     _id = LAVA
 
     def damage(self) -> int:
@@ -47,6 +58,7 @@ class Lava(Tile):
 
 class Wall(Tile):
     """ A simple blocking tile. """
+    __slots__ = ()
     _id = WALL
 
     def is_blocking(self) -> bool:
@@ -56,6 +68,7 @@ class Door(Tile):
     """ A door in the maze. A door starts as blocking, but must be unlocked by
         the player before they can walk through it.
     """
+    __slots__ = ('_blocking',)
     _name = 'Door'
     _id = DOOR
 
@@ -73,10 +86,15 @@ class Door(Tile):
         """ Unlocks the door by setting it to be non-blocking. """
         self._blocking = False
 
+    def lock(self) -> None:
+        """ Locks the door again by setting it to be blocking. """
+        self._blocking = True
+
 
 
 class Entity:
     """ Abstract base class for any entity."""
+    __slots__ = ('_position',)
     _id = 'E'
     def __init__(self, position: tuple[int, int]) -> None:
         """Sets up the entity at the provided location.
@@ -109,7 +127,15 @@ class Entity:
 
 class Item(Entity):
     """ Abstract class providing an interface for all items in the game. """
+    __slots__ = ()
     _id = ITEM
+    _stateless = True # Instances differ only in where they were placed
+
+    def is_stateless(self) -> bool:
+        """ Returns True iff instances of this item only differ in position,
+            so that an inventory can count them rather than keep each one.
+        """
+        return self._stateless
 
     def apply(self, player: 'Player') -> None:
         """ Applies the item's effect to the given player.
@@ -122,6 +148,7 @@ class Item(Entity):
 
 class Potion(Item):
     """ A potion restores the players HP by 20 when applied. """
+    __slots__ = ()
     _id = POTION
 
     def apply(self, player: 'Player') -> None:
@@ -131,6 +158,7 @@ class Potion(Item):
 
 class Coin(Item):
     """ Coins are collected by the player to allow the door to be unlocked. """
+    __slots__ = ()
     _id = COIN
 
     def apply(self, player: 'Player') -> None:
@@ -143,6 +171,7 @@ class Food(Item):
         food item decreases the player's hunger by a set amount depending on the
         type of food.
     """
+    __slots__ = ()
     _id = FOOD
     _amount = 0
 
@@ -153,18 +182,21 @@ class Food(Item):
 
 class Apple(Food):
     """ Apples decrease the players hunger by 1. """
+    __slots__ = ()
     _id = APPLE
     _amount = APPLE_AMOUNT
 
 
 class Honey(Food):
     """ Honey decreases the players hunger by 5. """
+    __slots__ = ()
     _id = HONEY
     _amount = HONEY_AMOUNT
 
 
 class Water(Item):
     """ Water decreases the player's thirst by 5. """
+    __slots__ = ()
     _id = WATER
 
     def apply(self, player: 'Player') -> None:
@@ -172,8 +204,46 @@ class Water(Item):
         player.change_thirst(WATER_AMOUNT)
 
 
+class CountedItems:
+    """ A read-only list-like view of a number of the same stateless item in
+        an inventory, which only stores one instance and the count.
+    """
+    __slots__ = ('_item', '_count')
+    def __init__(self, item: Item, count: int = 1) -> None:
+        """ Sets up the view.
+
+        Parameters:
+            item: The instance which stands for every item counted.
+            count: The number of items.
+        """
+        self._item = item
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> Item:
+        if not -self._count <= index < self._count:
+            raise IndexError('item index out of range')
+        return self._item
+
+    def __iter__(self):
+        for _ in range(self._count):
+            yield self._item
+
+    def __eq__(self, other: object) -> bool:
+        return list(self) == other
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
 class Inventory:
-    """ A collection of items. """
+    """ A collection of items. Stateless items (see Item.is_stateless) are
+        counted, so adding, removing and counting them is O(1) and collected
+        instances aren't kept alive; get_items shows them as CountedItems.
+    """
+    __slots__ = ('_items',)
     def __init__(self, initial_items: Optional[list[Item]] = None) -> None:
         """ Sets up this inventory with the initial items (if provided). Else
             sets up a new empty inventory.
@@ -181,7 +251,7 @@ class Inventory:
         Parameters:
             initial_items: An optional list of initial items to put in inventory
         """
-        self._items = {}
+        self._items = {} # Maps names to CountedItems or lists of Items
         if initial_items is not None:
             for item in initial_items:
                 self.add_item(item)
@@ -192,9 +262,14 @@ class Inventory:
         Parameters:
             item: The item to add
         """
-        items = self._items.get(item.get_name(), [])
-        items.append(item)
-        self._items[item.get_name()] = items
+        items = self._items.get(item.get_name())
+        if items is None:
+            self._items[item.get_name()] = CountedItems(item) \
+                if item.is_stateless() else [item]
+        elif isinstance(items, CountedItems):
+            items._count += 1
+        else:
+            items.append(item)
 
     def get_items(self) -> dict[str, list[Item]]:
         """ Returns the a dictionary mapping item names to the instances of the
@@ -202,6 +277,14 @@ class Inventory:
         """
         return self._items
 
+    def get_count(self, item_name: str) -> int:
+        """ Returns the number of items with the given name in the inventory.
+
+        Parameters:
+            item_name: The name of the item to count.
+        """
+        return len(self._items.get(item_name, ()))
+
     def remove_item(self, item_name: str) -> Optional['Item']:
         """ Removes one instance of the item with the given name from inventory,
             if one exists.
@@ -214,13 +297,58 @@ class Inventory:
 
         """
         items = self._items.get(item_name)
-        if items is None or items == []:
+        if items is None:
             return None
+        elif isinstance(items, CountedItems):
+            items._count -= 1
+            item = items._item
         else:
             item = items.pop(0)
-            if self._items.get(item_name) == []:
-                del self._items[item_name]
-            return item
+        if not items:
+            del self._items[item_name]
+        return item
+
+    def pop_item(self, item_name: str) -> Item:
+        """ Removes the most recently added instance of the item with the given
+            name, undoing add_item.
+
+        Pre-conditions:
+            There must be an item with the given name in the inventory.
+
+        Parameters:
+            item_name: The name of the item to remove one instance of.
+        """
+        items = self._items[item_name]
+        if isinstance(items, CountedItems):
+            items._count -= 1
+            item = items._item
+        else:
+            item = items.pop()
+        if not items:
+            del self._items[item_name]
+        return item
+
+    def return_item(self, item: Item) -> None:
+        """ Puts an item back as the next to be removed, undoing remove_item.
+
+        Parameters:
+            item: The item to put back.
+        """
+        items = self._items.get(item.get_name())
+        if isinstance(items, list):
+            items.insert(0, item)
+        else:
+            self.add_item(item)
+
+    def copy(self) -> 'Inventory':
+        """ Returns a copy of this inventory holding the same items. """
+        inventory = Inventory()
+        inventory._items = {
+            name: CountedItems(items._item, items._count)
+            if isinstance(items, CountedItems) else list(items)
+            for name, items in self._items.items()
+        }
+        return inventory
     
     def __str__(self):
         text = [f'{name}: {len(items)}' for name, items in self._items.items()]
@@ -239,6 +367,7 @@ class DynamicEntity(Entity):
 
         Note: they'll extend this in A3 to have direction and an Enemy subclass.
     """
+    __slots__ = ()
     _id = DYNAMIC_ENTITY
     
     def set_position(self, new_position: tuple[int, int]) -> None:
@@ -252,6 +381,7 @@ class DynamicEntity(Entity):
 
 class Player(DynamicEntity):
     """ The player in the game. """
+    __slots__ = ('_health', '_hunger', '_thirst', '_inventory')
     _id = PLAYER
 
     def __init__(self, position: tuple[int, int]) -> None:
@@ -328,6 +458,12 @@ class Player(DynamicEntity):
         """ Returns the players inventory. """
         return self._inventory
 
+    def copy(self) -> 'Player':
+        """ Returns a copy of this player with their own inventory. """
+        player = copy.copy(self)
+        player._inventory = self._inventory.copy()
+        return player
+
 
 def load_game(filename: str) -> list['Level']:
     """ Reads a game file and creates a list of all the levels in order.
@@ -343,16 +479,137 @@ def load_game(filename: str) -> list['Level']:
         for line in file:
             line = line.strip()
             if line.startswith('Maze'):
-                _, _, dimensions = line[5:].partition(' - ')
-                dimensions = [int(item) for item in dimensions.split()]
-                levels.append(Level(dimensions))
+                levels.append(Level(_parse_dimensions(line)))
             elif len(line) > 0 and len(levels) > 0:
                 levels[-1].add_row(line)
     return levels
 
+def _parse_dimensions(header: str) -> list[int]:
+    """ Returns the [#rows, #columns] from a 'Maze N - rows cols' header.
+
+    Parameters:
+        header: The stripped header line.
+    """
+    _, _, dimensions = header[5:].partition(' - ')
+    return [int(item) for item in dimensions.split()]
+
+# Matches the header line at the start of each level in a game file.
+_LEVEL_HEADER = re.compile(rb'^[ \t\r\f\v]*Maze[^\n]*', re.MULTILINE)
+
+class LevelIndex:
+    """ The levels of a game file, parsed only when they're first needed.
+
+        Creating an index makes one scan over the file for the level headers,
+        recording where each level starts. Indexing it then parses that level
+        from its part of the file. Recently used levels are kept in a bounded
+        cache so repeated lookups of the current level are cheap, and so
+        changes made to it while playing are kept.
+    """
+    def __init__(self, filename: str, cache_size: int = 4) -> None:
+        """ Indexes the levels in the game file.
+
+        Parameters:
+            filename: The path to the game file.
+            cache_size: The most parsed levels to keep at once.
+        """
+        self._filename = filename
+        self._cache_size = max(cache_size, 1)
+        self._cache = OrderedDict()
+        self._offsets = [] # (start of rows, end of level) for each level
+        self._dimensions = []
+        self._content_hash = hashlib.blake2b(digest_size=16)
+        with open(filename, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                self._content_hash.update(data)
+                headers = list(_LEVEL_HEADER.finditer(data))
+                for header, following in zip(headers, headers[1:] + [None]):
+                    end = len(data) if following is None \
+                        else following.start()
+                    self._offsets.append((header.end(), end))
+                    self._dimensions.append(
+                        _parse_dimensions(header.group().decode().strip())
+                    )
+
+    def __len__(self) -> int:
+        """ Returns the number of levels in the game file. """
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> 'Level':
+        """ Returns the level at the given index, parsing it if necessary.
+
+        Parameters:
+            index: The index of the level, in the order of the file.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('level index out of range')
+        level = self._cache.get(index)
+        if level is not None:
+            self._cache.move_to_end(index)
+            return level
+
+        level = self._parse_level(index)
+        self._cache[index] = level
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return level
+
+    def _parse_level(self, index: int) -> 'Level':
+        """ Reads and parses the level at the given index from the file.
+
+        Parameters:
+            index: The index of the level to parse.
+        """
+        start, end = self._offsets[index]
+        with open(self._filename, 'rb') as file:
+            file.seek(start)
+            text = file.read(end - start).decode()
+        level = Level(self._dimensions[index])
+        for line in text.splitlines():
+            line = line.strip()
+            if len(line) > 0:
+                level.add_row(line)
+        return level
+
+    def get_content_hash(self) -> bytes:
+        """ Returns a 16 byte hash of the game file's contents when indexed. """
+        return self._content_hash.digest()
+
+    def get_dimensions(self, index: int) -> list[int]:
+        """ Returns the [#rows, #columns] of a level without parsing it.
+
+        Parameters:
+            index: The index of the level.
+        """
+        return self._dimensions[index]
+
+    def __repr__(self) -> str:
+        return f"LevelIndex('{self._filename}')"
+
+# Translation table mapping any character that isn't a tile ID onto an empty
+# tile, as entities are assumed to stand on empty ground.
+_TILE_CODES = bytes(
+    code if chr(code) in (WALL, EMPTY, DOOR, LAVA) else ord(EMPTY)
+    for code in range(256)
+)
+
+# Draws unlocked doors as empty tiles.
+_UNLOCKED_CODES = bytes.maketrans(DOOR.encode(), EMPTY.encode())
+_NEWLINE = ord('\n')
+
 class Maze:
     """ Models a single map for one level. Only includes ground information,
-        excluding information about entities. """
+        excluding information about entities.
+
+        Tiles are stored as one byte per cell (the tile's ID character) in a
+        flat bytearray, and get_tile hands out shared tile instances rather
+        than creating one object per cell. Doors are the only stateful tiles;
+        each maze shares a single Door instance between all of its door cells,
+        so the lock state is tracked once per maze.
+    """
     TILES = {
         WALL: Wall,
         EMPTY: Empty,
@@ -360,6 +617,11 @@ class Maze:
         LAVA: Lava,
     }
 
+    # Stateless tiles can be shared between every cell of every maze.
+    _SHARED_TILES = {ord(tile_id): tile() for tile_id, tile in TILES.items()
+                     if tile is not Door}
+    _DOOR_CODE = ord(DOOR)
+
     def __init__(self, dimensions: tuple[int, int]) -> None:
         """Sets up an empty maze of given dimensions.
         
@@ -367,7 +629,17 @@ class Maze:
             dimensions: (#rows, #columns)
         """
         self._dimensions = dimensions
-        self._tiles = []
+        self._grid = bytearray()
+        self._num_rows = 0
+        self._door = Door()
+        self._door_positions = []
+        self._exit_positions = set() # Doors on the edge of the maze
+
+        # Indexed by tile code to find the shared instance for that code
+        self._tile_table = [None] * 256
+        for code, tile in self._SHARED_TILES.items():
+            self._tile_table[code] = tile
+        self._tile_table[self._DOOR_CODE] = self._door
     
     def get_dimensions(self) -> tuple[int, int]:
         """ Returns the dimensions of this maze. """
@@ -380,20 +652,122 @@ class Maze:
             row: String of the tile IDs from which to construct Tile instances.
         """
         # If there is an entity in a spot, assume the ground underneath is empty
-        self._tiles.append([self.TILES.get(tile, Empty)() for tile in row])
-
-    def get_tiles(self) -> list[list[Tile]]:
+        num_cols = self._dimensions[1]
+        codes = row.encode('latin-1', 'replace').translate(_TILE_CODES)
+        codes = codes[:num_cols].ljust(num_cols, EMPTY.encode())
+        self._grid += codes
+
+        row_num = self._num_rows
+        on_edge = row_num == 0 or row_num == self._dimensions[0] - 1
+        col = codes.find(self._DOOR_CODE)
+        while col != -1:
+            self._door_positions.append((row_num, col))
+            if on_edge or col == 0 or col == num_cols - 1:
+                self._exit_positions.add((row_num, col))
+            col = codes.find(self._DOOR_CODE, col + 1)
+        self._num_rows += 1
+
+    def get_tiles(self) -> 'TileRows':
         """ Returns the Tile instances in this maze. Each element is a row of
             Tile instances in order.
         """
-        return self._tiles
+        return TileRows(self)
+
+    def get_codes(self) -> memoryview:
+        """ Returns the ID of every tile in row order, one byte per cell, as a
+            read-only view of the maze rather than a copy. Doors are included
+            as doors whether or not they're unlocked. No more rows can be
+            added to the maze while the view is held.
+        """
+        return memoryview(self._grid).toreadonly()
+
+    def get_num_rows(self) -> int:
+        """ Returns the number of rows that have been added to this maze. """
+        return self._num_rows
+
+    def get_row(self, row: int) -> list[Tile]:
+        """ Returns the shared Tile instances in the given row of the maze.
+
+        Parameters:
+            row: The index of the row to return.
+        """
+        num_cols = self._dimensions[1]
+        start = row * num_cols
+        tile_table = self._tile_table
+        return [tile_table[code] for code in self._grid[start:start + num_cols]]
     
-    def unlock_door(self) -> None:
-        """ Unlocks any doors that exist in the maze. """
-        for row in self._tiles:
-            for tile in row:
-                if isinstance(tile, Door):
-                    tile.unlock()
+    def get_window(self, top: int, left: int, height: int, width: int) \
+        -> bytearray:
+        """ Returns the IDs of the tiles in a rectangle of the maze, as drawn
+            by str(maze), one byte per cell with a newline after each row.
+
+        Parameters:
+            top, left: The (row, column) position of the rectangle's corner.
+            height, width: The number of rows and columns in the rectangle.
+        """
+        num_cols = self._dimensions[1]
+        grid = self._grid
+        window = bytearray()
+        for start in range(top * num_cols + left,
+                           (top + height) * num_cols + left, num_cols):
+            window += grid[start:start + width]
+            window.append(_NEWLINE)
+        if not self._door.is_blocking():
+            window = window.translate(_UNLOCKED_CODES)
+        return window
+
+    def get_door_positions(self) -> list[tuple[int, int]]:
+        """ Returns the (row, column) positions of every door in this maze. """
+        return self._door_positions
+
+    def is_exit(self, position: tuple[int, int]) -> bool:
+        """ Returns True iff the position is a door on the edge of the maze,
+            from which the player can escape.
+
+        Parameters:
+            position: The (row, column) position to check.
+        """
+        return position in self._exit_positions
+
+    def is_unlocked(self) -> bool:
+        """ Returns True iff the doors in this maze have been unlocked. """
+        return not self._door.is_blocking()
+
+    def copy(self) -> 'Maze':
+        """ Returns a copy of this maze with its own door state. The tiles are
+            shared with this maze rather than copied, so no more rows should
+            be added to either maze.
+        """
+        maze = copy.copy(self)
+        maze._door = Door()
+        if not self._door.is_blocking():
+            maze._door.unlock()
+        maze._tile_table = list(self._tile_table)
+        maze._tile_table[self._DOOR_CODE] = maze._door
+        return maze
+
+    def unlock_door(self) -> list[tuple[int, int]]:
+        """ Unlocks any doors that exist in the maze.
+
+        Returns:
+            The positions of the doors which changed, so they can be redrawn.
+            This is empty if the doors were already unlocked.
+        """
+        if not self._door.is_blocking():
+            return []
+        self._door.unlock()
+        return list(self._door_positions)
+
+    def lock_door(self) -> list[tuple[int, int]]:
+        """ Locks the doors in the maze again, undoing unlock_door.
+
+        Returns:
+            The positions of the doors which changed, so they can be redrawn.
+        """
+        if self._door.is_blocking():
+            return []
+        self._door.lock()
+        return list(self._door_positions)
     
     def get_tile(self, position: tuple[int, int]) -> Tile:
         """ Returns the Tile instance at the given position.
@@ -402,19 +776,65 @@ class Maze:
             position: The (row, column) position from which to find the tile.
         """
         row, col = position
-        return self._tiles[row][col]
+        num_rows, num_cols = self._num_rows, self._dimensions[1]
+        if not 0 <= row < num_rows or not 0 <= col < num_cols:
+            # Negative indices wrap around, like indexing a list of rows
+            if not -num_rows <= row < num_rows \
+                or not -num_cols <= col < num_cols:
+                raise IndexError(f'position {position} is outside the maze')
+            row, col = row % num_rows, col % num_cols
+        return self._tile_table[self._grid[row * num_cols + col]]
     
     def __str__(self) -> str:
         """ Returns the string representation of this maze. """
-        return '\n'.join(
-            [''.join([tile.get_id() for tile in row]) for row in self._tiles]
-        )
+        text = self._grid.decode('latin-1')
+        if not self._door.is_blocking():
+            text = text.replace(DOOR, EMPTY)
+        num_cols = self._dimensions[1]
+        return '\n'.join(text[start:start + num_cols]
+                         for start in range(0, len(text), num_cols))
     
     def __repr__(self) -> str:
         """ Returns the computer representation of this maze. """
         return f"Maze({self._dimensions})"
 
 
+class TileRows:
+    """ A read-only view of a maze's tiles which behaves like the nested list
+        of rows of Tile instances that the views expect.
+    """
+    def __init__(self, maze: Maze) -> None:
+        """ Sets up a view over the tiles in the given maze.
+
+        Parameters:
+            maze: The maze whose tiles to present.
+        """
+        self._maze = maze
+
+    def __len__(self) -> int:
+        """ Returns the number of rows in the maze. """
+        return self._maze.get_num_rows()
+
+    def __getitem__(self, row: int) -> list[Tile]:
+        """ Returns the list of Tile instances in the given row. """
+        num_rows = len(self)
+        if not -num_rows <= row < num_rows:
+            raise IndexError('maze row out of range')
+        return self._maze.get_row(row % num_rows)
+
+    def __iter__(self):
+        """ Iterates over the rows of Tile instances in the maze. """
+        for row in range(len(self)):
+            yield self._maze.get_row(row)
+
+    def __repr__(self) -> str:
+        """ Returns the computer representation of this view. """
+        return f"TileRows({self._maze!r})"
+
+
+# Matches the characters in a row which may be entities rather than tiles.
+_ENTITY_CHARS = re.compile(f'[^{re.escape(WALL + EMPTY + DOOR + LAVA)}]')
+
 class Level:
     """ Models one level of a game, including maze and entities. """
     ENTITIES = {
@@ -433,6 +853,9 @@ class Level:
         """
         self._maze = Maze(dimensions)
         self._items = {} # Maps positions to Item instances
+        self._item_counts = {} # Maps item IDs to the number left in the level
+        self._shares_items = False # True while _items is shared with a copy
+        self._removed = [] # Positions of items removed, in order
         self._player_start = None
     
     def get_maze(self) -> Maze:
@@ -441,12 +864,17 @@ class Level:
     
     def _contains_coins(self) -> bool:
         """ Returns True iff there are any more coins left in this level. """
-        return any([item.get_id() == COIN for item in self._items.values()])
+        return self._item_counts.get(COIN, 0) > 0
+
+    def attempt_unlock_door(self) -> list[tuple[int, int]]:
+        """ Unlocks the doors in the maze if there are no coins remaining.
 
-    def attempt_unlock_door(self) -> None:
-        """ Unlocks the doors in the maze if there are no coins remaining. """
+        Returns:
+            The positions of any doors which were unlocked.
+        """
         if not self._contains_coins():
-            self._maze.unlock_door()
+            return self._maze.unlock_door()
+        return []
     
     def add_row(self, row: str) -> None:
         """ Adds the tiles and entities from the row to this level.
@@ -454,10 +882,10 @@ class Level:
         Parameters:
             row: A string of tile or entity IDs.
         """
-        row_num = len(self._maze.get_tiles())
+        row_num = self._maze.get_num_rows()
         self._maze.add_row(row)
-        for col_num, char in enumerate(row):
-            self.add_entity((row_num, col_num), char)
+        for match in _ENTITY_CHARS.finditer(row):
+            self.add_entity((row_num, match.start()), match.group())
     
     def add_entity(self, position: tuple[int, int], entity_id: str) -> None:
         """ Adds a new entity to this level.
@@ -467,7 +895,12 @@ class Level:
             entity_id: The ID of the entity to add.
         """
         if self.ENTITIES.get(entity_id) is not None:
+            self._own_items()
+            if position in self._items:
+                self._discount_item(self._items[position])
             self._items[position] = self.ENTITIES.get(entity_id)(position)
+            self._item_counts[entity_id] = \
+                self._item_counts.get(entity_id, 0) + 1
         if entity_id == PLAYER:
             self.add_player_start(position)
 
@@ -490,7 +923,73 @@ class Level:
         Parameters:
             position: the (row, column) position from which to delete an item.
         """
-        del self._items[position]
+        self._own_items()
+        self._discount_item(self._items.pop(position))
+        self._removed.append(position)
+
+    def restore_item(self, item: Item) -> None:
+        """ Puts the most recently removed item back at its position, undoing
+            remove_item.
+
+        Parameters:
+            item: The item which was removed last.
+        """
+        self._own_items()
+        self._items[item.get_position()] = item
+        item_id = item.get_id()
+        self._item_counts[item_id] = self._item_counts.get(item_id, 0) + 1
+        self._removed.pop()
+
+    def get_removed_positions(self) -> list[tuple[int, int]]:
+        """ Returns the positions from which items have been removed, in the
+            order they were removed.
+        """
+        return self._removed
+
+    def _own_items(self) -> None:
+        """ Makes this level's own copy of its items before they are changed,
+            if they are still shared with another copy of the level.
+        """
+        if self._shares_items:
+            self._items = dict(self._items)
+            self._item_counts = dict(self._item_counts)
+            self._shares_items = False
+
+    def copy(self) -> 'Level':
+        """ Returns a copy of this level in its current state. The copy shares
+            this level's tiles, and shares its items until either level
+            changes them, so copying is cheap regardless of the level's size.
+        """
+        level = copy.copy(self)
+        level._maze = self._maze.copy()
+        level._removed = list(self._removed)
+        level._shares_items = self._shares_items = True
+        return level
+
+    def _discount_item(self, item: Item) -> None:
+        """ Decrements the remaining count for the given item's type.
+
+        Parameters:
+            item: The item which has been removed from this level.
+        """
+        item_id = item.get_id()
+        self._item_counts[item_id] -= 1
+        if self._item_counts[item_id] == 0:
+            del self._item_counts[item_id]
+
+    def get_item_count(self, item_id: str) -> int:
+        """ Returns the number of items with the given ID left in this level.
+
+        Parameters:
+            item_id: The ID of the item type to count.
+        """
+        return self._item_counts.get(item_id, 0)
+
+    def get_item_counts(self) -> dict[str, int]:
+        """ Returns a mapping from item IDs to the number of items of that type
+            remaining in this level. Item types with none left are omitted.
+        """
+        return dict(self._item_counts)
     
     def add_player_start(self, position: tuple[int, int]) -> None:
         """ Adds the start position for the player in this level.
@@ -514,21 +1013,161 @@ class Level:
         return f"Level({self.get_dimensions()})"
 
 
+# Saved game format. The header holds the magic bytes, format version,
+# flags, game file content hash, level index, player (row, column), (HP,
+# hunger, thirst), number of moves, number of inventory entries, number of
+# items in the unplayed level and the length of the game file path.
+SAVE_MAGIC = b'MZRS'
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct('<4sBB16sIiihhhIBIH')
+SAVE_ITEM = struct.Struct('<cI')
+SAVE_WON = 1
+SAVE_LEVELLED_UP = 2
+SAVE_DOOR_UNLOCKED = 4
+
+
+class SavedState(NamedTuple):
+    """ The contents of a saved game. """
+    flags: int
+    content_hash: bytes
+    level_num: int
+    position: tuple[int, int]
+    stats: tuple[int, int, int]
+    num_moves: int
+    inventory: list[tuple[str, int]] # (item ID, count) in inventory order
+    removed: list[int] # Indices of the items removed from the level
+    game_file: str
+
+
+def read_saved_state(data: bytes) -> SavedState:
+    """ Decodes a saved game made by Model.dump_state.
+
+    Parameters:
+        data: The contents of the saved game.
+
+    Raises:
+        ValueError: If data isn't a saved game in a supported version.
+    """
+    if len(data) < SAVE_HEADER.size or not data.startswith(SAVE_MAGIC):
+        raise ValueError('not a MazeRunner saved game')
+    (_, version, flags, content_hash, level_num, row, col, hp, hunger,
+     thirst, num_moves, num_inventory, num_items, path_length) \
+        = SAVE_HEADER.unpack_from(data)
+    if version != SAVE_VERSION:
+        raise ValueError(f'unsupported saved game version {version}')
+
+    offset = SAVE_HEADER.size
+    bitmap_length = (num_items + 7) // 8
+    end = offset + num_inventory * SAVE_ITEM.size + bitmap_length \
+        + path_length
+    if len(data) != end:
+        raise ValueError('saved game is truncated or corrupt')
+
+    inventory = []
+    for _ in range(num_inventory):
+        item_id, count = SAVE_ITEM.unpack_from(data, offset)
+        item_id = item_id.decode()
+        if item_id not in Level.ENTITIES:
+            raise ValueError(f'unknown item {item_id!r} in saved game')
+        inventory.append((item_id, count))
+        offset += SAVE_ITEM.size
+
+    removed = []
+    for byte_index, byte in enumerate(data[offset:offset + bitmap_length]):
+        while byte:
+            bit = byte & -byte
+            removed.append(byte_index * 8 + bit.bit_length() - 1)
+            byte ^= bit
+    offset += bitmap_length
+
+    return SavedState(
+        flags, content_hash, level_num, (row, col), (hp, hunger, thirst),
+        num_moves, inventory, removed, data[offset:].decode(),
+    )
+
+
+def load_saved_game(filename: str, game_file: Optional[str] = None) \
+    -> 'Model':
+    """ Creates a model in the state saved in a file by Model.save_state.
+
+    Parameters:
+        filename: The path of the saved game.
+        game_file: The game file the save is of, if it has moved since the
+                   game was saved. Defaults to the path stored in the save.
+
+    Raises:
+        ValueError: If the file isn't a saved game, or the game file has
+                    changed since the game was saved.
+    """
+    with open(filename, 'rb') as file:
+        data = file.read()
+    if game_file is None:
+        game_file = read_saved_state(data).game_file
+    model = Model(game_file)
+    model.restore_state(data)
+    return model
+
+
+class Delta(NamedTuple):
+    """ The changes made to a game by one move or item use, recording just
+        enough of the previous state to undo them.
+    """
+    move: Optional[tuple[int, int]] # The move's delta; None for an item use
+    position: tuple[int, int] # The player's previous position
+    stats: tuple[int, int, int] # The player's previous (HP, hunger, thirst)
+    num_moves: int # The previous number of moves
+    did_level_up: bool # The previous result of Model.did_level_up
+    collected: Optional[Item] = None # The item picked up, if any
+    unlocked: bool = False # True iff the doors were unlocked
+    level: Optional[Level] = None # The level left by escaping, if any
+    used: Optional[Item] = None # The item applied from the inventory, if any
+
+
 class Model:
     """ The overall model for a game of MazeRunner """
-    def __init__(self, game_file: str) -> None:
+    def __init__(self, game_file: str, max_undo: int = MAX_UNDO) -> None:
         """ Constructs a new game.
         
         Parameters:
             game_file: The file containing the levels for this game.
+            max_undo: The number of moves and item uses which can be undone.
+                      The oldest are forgotten once there are more.
+        """
+        self._levels = LevelIndex(game_file)
+        self._game_file = game_file
+        self._max_undo = max_undo
+        self.restart()
+
+    def restart(self) -> None:
+        """ Restarts the game from the beginning of the first level. Levels
+            are restored from the pristine copies in the level index, so the
+            game file is only read again for levels it has evicted.
         """
-        self._levels = load_game(game_file)
         self._level_num = 0
+        self._level = self._get_pristine_level(0).copy()
         self._player = Player(self.get_level().get_player_start())
         self._won = False
         self._did_level_up = False
         self._num_moves = 0
-        self._game_file = game_file
+        self._clear_journal()
+
+    def _clear_journal(self) -> None:
+        """ Forgets all moves which could be undone or redone. """
+        # Bounded so long games don't grow the journal without limit; the
+        # oldest delta, and any level only it refers to, is dropped first.
+        self._undo_deltas = deque(maxlen=self._max_undo)
+        self._redo_deltas = []
+
+    def _get_pristine_level(self, level_num: int) -> Level:
+        """ Returns the unplayed state of the given level. Pristine levels
+            live in the level index's bounded cache and are never changed;
+            only copies of them are played, so an evicted level can simply be
+            parsed again.
+
+        Parameters:
+            level_num: The index of the level in the game file.
+        """
+        return self._levels[level_num]
 
     def has_won(self) -> bool:
         """ Returns True iff the game has been won (i.e. all levels have been
@@ -546,7 +1185,7 @@ class Model:
 
     def get_level(self) -> Level:
         """ Returns the current level. """
-        return self._levels[self._level_num]
+        return self._level
     
     def did_level_up(self) -> True:
         """ Returns True if the player just moved to the next level on the
@@ -562,26 +1201,41 @@ class Model:
         if self._level_num >= len(self._levels):
             self._won = True
         else:
+            self._level = self._get_pristine_level(self._level_num).copy()
             self._player.set_position(self.get_level().get_player_start())
             self._did_level_up = True
 
     def move_player(self, delta: tuple[int, int]) -> None:
         """ Tries to move the player by the requested amount. Levels up if the
             user finishes the maze, """
+        # There's no level left to move in once the game is won
+        if self._won:
+            return
+        did_level_up = self._did_level_up
         self._did_level_up = False
         old_pos = self._player.get_position()
         position = row, col = old_pos[0] + delta[0], old_pos[1] + delta[1]
         max_row, max_col = self.get_level().get_dimensions()
 
-        # Check if player has escaped the maze
-        if (row < 0 or row >= max_row or col < 0 or col >= max_col) and \
-            isinstance(self.get_current_maze().get_tile(old_pos), Door):
-            self.level_up()
+        # Check if player has escaped the maze. Moving off the edge anywhere
+        # else is blocked, like walking into a wall.
+        if row < 0 or row >= max_row or col < 0 or col >= max_col:
+            if self.get_current_maze().is_exit(old_pos):
+                level = self.get_level()
+                stats = self.get_player_stats()
+                self.level_up()
+                if self._won:
+                    # The last level stays current, so play on a copy to keep
+                    # the level recorded for undo as it was
+                    self._level = level.copy()
+                self._record(Delta(delta, old_pos, stats, self._num_moves,
+                                   did_level_up, level=level))
 
         # Move player if tile is non-blocking and update stats
         else:
             tile = self.get_current_maze().get_tile(position)
             if not tile.is_blocking():
+                stats = self.get_player_stats()
                 self._num_moves += 1
         
                 if self._num_moves % 5 == 0:
@@ -590,20 +1244,112 @@ class Model:
                 self._player.change_health(-1 - tile.damage())
 
                 self._player.set_position(position)
-                self.attempt_collect_item(position)
+                item = self.get_current_items().get(position)
+                unlocked = self.attempt_collect_item(position)
+                self._record(Delta(delta, old_pos, stats, self._num_moves - 1,
+                                   did_level_up, item, bool(unlocked)))
     
-    def attempt_collect_item(self, position: tuple[int, int]) -> None:
+    def attempt_collect_item(self, position: tuple[int, int]) \
+        -> list[tuple[int, int]]:
         """ Collect the item at the given position if one exists. Unlock door if
             all coins have been collected.
         
         Parameters:
             position: The position from which to attempt to collect an item.
+
+        Returns:
+            The positions of any doors which were unlocked.
         """
         item = self.get_level().get_items().get(position)
         if item is not None:
             self._player.add_item(item)
             self.get_level().remove_item(position)
-        self.get_level().attempt_unlock_door()
+        return self.get_level().attempt_unlock_door()
+
+    def apply_item(self, item_name: str) -> bool:
+        """ Applies one of the items with the given name from the player's
+            inventory to the player.
+
+        Parameters:
+            item_name: The name of the item to apply.
+
+        Returns:
+            True iff the player had an item with that name.
+        """
+        stats = self.get_player_stats()
+        item = self.get_player_inventory().remove_item(item_name)
+        if item is None:
+            return False
+        item.apply(self._player)
+        self._record(Delta(None, self._player.get_position(), stats,
+                           self._num_moves, self._did_level_up, used=item))
+        return True
+
+    def _record(self, delta: Delta) -> None:
+        """ Adds the changes made by a move or item use to the undo journal.
+            A new move can't be redone after, so the redo journal is cleared.
+
+        Parameters:
+            delta: The changes to record.
+        """
+        self._undo_deltas.append(delta)
+        self._redo_deltas.clear()
+
+    def undo(self) -> bool:
+        """ Reverts the last move or item use which changed the game. Blocked
+            moves aren't recorded, so they aren't undone.
+
+        Returns:
+            True iff there was something to undo.
+        """
+        if not self._undo_deltas:
+            return False
+        delta = self._undo_deltas.pop()
+        player = self._player
+
+        if delta.level is not None:
+            # Copies of this model may share the delta, so play on a copy
+            self._level_num -= 1
+            self._level = delta.level.copy()
+            self._won = False
+        if delta.unlocked:
+            self.get_current_maze().lock_door()
+        if delta.collected is not None:
+            player.get_inventory().pop_item(delta.collected.get_name())
+            self.get_level().restore_item(delta.collected)
+        if delta.used is not None:
+            player.get_inventory().return_item(delta.used)
+
+        hp, hunger, thirst = delta.stats
+        player.change_health(hp - player.get_health())
+        player.change_hunger(hunger - player.get_hunger())
+        player.change_thirst(thirst - player.get_thirst())
+        player.set_position(delta.position)
+        self._num_moves = delta.num_moves
+        self._did_level_up = delta.did_level_up
+        self._redo_deltas.append(delta)
+        return True
+
+    def redo(self) -> bool:
+        """ Repeats the last move or item use which was undone.
+
+        Returns:
+            True iff there was something to redo.
+        """
+        if not self._redo_deltas:
+            return False
+        delta = self._redo_deltas.pop()
+
+        # Undo restored the exact state before the delta, so repeating the
+        # action makes the same changes. Keep the rest of the redo journal,
+        # which recording the repeated action would otherwise clear.
+        redo_deltas, self._redo_deltas = self._redo_deltas, []
+        if delta.used is not None:
+            self.apply_item(delta.used.get_name())
+        else:
+            self.move_player(delta.move)
+        self._redo_deltas = redo_deltas
+        return True
         
     def get_player(self) -> Player:
         """ Returns the player in the game. """
@@ -627,6 +1373,163 @@ class Model:
             positions in the current maze. """
         return self.get_level().get_items()
 
+    def get_level_num(self) -> int:
+        """ Returns the index of the current level in the game file. This is
+            the number of levels once the game has been won.
+        """
+        return self._level_num
+
+    def get_num_moves(self) -> int:
+        """ Returns the number of successful moves the player has made. """
+        return self._num_moves
+
+    def get_game_file(self) -> str:
+        """ Returns the path of the game file this model was loaded from. """
+        return self._game_file
+
+    def copy(self) -> 'Model':
+        """ Returns an independent copy of this game in its current state,
+            including what can be undone and redone. Levels are copied on
+            write and the game file isn't read again, so copying is cheap.
+        """
+        model = copy.copy(self)
+        model._level = self._level.copy()
+        model._player = self._player.copy()
+        model._undo_deltas = deque(self._undo_deltas, self._max_undo)
+        model._redo_deltas = list(self._redo_deltas)
+        return model
+
+    def get_content_hash(self) -> bytes:
+        """ Returns a hash of the game file's contents, identifying the game
+            in saved games.
+        """
+        return self._levels.get_content_hash()
+
+    def _get_item_order(self, level_num: int) -> list[tuple[int, int]]:
+        """ Returns the positions of the items in the unplayed level, in the
+            order used for the removed-item bitmap in saved games.
+
+        Parameters:
+            level_num: The index of the level in the game file.
+        """
+        return list(self._get_pristine_level(level_num).get_items())
+
+    def save_state(self, filename: str) -> None:
+        """ Saves the state of this game to a file. The levels themselves are
+            not saved, only a reference to the game file and what has changed
+            in the current level.
+
+        Parameters:
+            filename: The path of the file to save to.
+        """
+        with open(filename, 'wb') as file:
+            file.write(self.dump_state())
+
+    def dump_state(self) -> bytes:
+        """ Returns the state of this game in the binary saved game format.
+
+            The format is the SAVE_HEADER fields (see SAVE_HEADER), then
+            each inventory entry as an item ID byte and 32-bit count, then the
+            removed-item bitmap with one bit per item in the unplayed level,
+            then the UTF-8 path of the game file.
+        """
+        flags = 0
+        if self._won:
+            flags |= SAVE_WON
+        if self._did_level_up:
+            flags |= SAVE_LEVELLED_UP
+        if self.get_current_maze().is_unlocked():
+            flags |= SAVE_DOOR_UNLOCKED
+        inventory = [(items[0].get_id().encode(), len(items)) for items
+                     in self.get_player_inventory().get_items().values()]
+
+        # Once the game is won, the last level stays the current level
+        level_num = min(self._level_num, len(self._levels) - 1)
+        removed = self.get_level().get_removed_positions()
+        num_items = len(self._get_pristine_level(level_num).get_items())
+        bitmap = bytearray((num_items + 7) // 8)
+        if removed:
+            order = {position: index for index, position
+                     in enumerate(self._get_item_order(level_num))}
+            for position in removed:
+                index = order[position]
+                bitmap[index >> 3] |= 1 << (index & 7)
+
+        path = self._game_file.encode()
+        row, col = self._player.get_position()
+        parts = [
+            SAVE_HEADER.pack(
+                SAVE_MAGIC, SAVE_VERSION, flags, self.get_content_hash(),
+                self._level_num, row, col, *self.get_player_stats(),
+                self._num_moves, len(inventory), num_items, len(path),
+            ),
+        ]
+        parts.extend(SAVE_ITEM.pack(item_id, count)
+                     for item_id, count in inventory)
+        parts.append(bitmap)
+        parts.append(path)
+        return b''.join(parts)
+
+    def load_state(self, filename: str) -> None:
+        """ Restores the game state saved in a file by save_state. The save
+            must be of this model's game file.
+
+        Parameters:
+            filename: The path of the saved game.
+
+        Raises:
+            ValueError: If the file isn't a saved game of this game file.
+        """
+        with open(filename, 'rb') as file:
+            self.restore_state(file.read())
+
+    def restore_state(self, data: bytes) -> None:
+        """ Restores a game state returned by dump_state.
+
+        Parameters:
+            data: The saved game state.
+
+        Raises:
+            ValueError: If data isn't a saved game of this game file.
+        """
+        saved = read_saved_state(data)
+        if saved.content_hash != self.get_content_hash():
+            raise ValueError('saved game is of a different game file')
+        if saved.level_num > len(self._levels) \
+            or saved.level_num == len(self._levels) \
+            and not saved.flags & SAVE_WON:
+            raise ValueError('saved level is not in the game file')
+
+        # Once the game is won, the last level stays the current level
+        level_num = min(saved.level_num, len(self._levels) - 1)
+        level = self._get_pristine_level(level_num).copy()
+        if saved.removed:
+            order = self._get_item_order(level_num)
+            if saved.removed[-1] >= len(order):
+                raise ValueError('saved items are not in the level')
+            for index in saved.removed:
+                level.remove_item(order[index])
+        if saved.flags & SAVE_DOOR_UNLOCKED:
+            level.get_maze().unlock_door()
+
+        # Restored inventory items are placed where the player is standing
+        hp, hunger, thirst = saved.stats
+        player = Player(saved.position)
+        player.change_health(hp - MAX_HEALTH)
+        player.change_hunger(hunger)
+        player.change_thirst(thirst)
+        for item_id, count in saved.inventory:
+            for _ in range(count):
+                player.add_item(Level.ENTITIES[item_id](saved.position))
+
+        self._level_num = saved.level_num
+        self._level = level
+        self._player = player
+        self._num_moves = saved.num_moves
+        self._won = bool(saved.flags & SAVE_WON)
+        self._did_level_up = bool(saved.flags & SAVE_LEVELLED_UP)
+        self._clear_journal()
+
     def __str__(self):
         return f"Model('{self._game_file}')"
     
@@ -645,6 +1548,20 @@ class MazeRunner:
         """
         self._model = Model(game_file)
         self._view = view
+        self._recorder = None
+
+    def get_model(self) -> Model:
+        """ Returns the model of the game being played. """
+        return self._model
+
+    def set_recorder(self, recorder: Optional['ReplayRecorder']) -> None:
+        """ Sets where each move and item use handled is recorded, or stops
+            recording if recorder is None.
+
+        Parameters:
+            recorder: The replay recorder (see replay.py) to record to.
+        """
+        self._recorder = recorder
 
     def _redraw(self) -> None:
         """ Redraws the entire view based on the current model state. """
@@ -669,6 +1586,24 @@ class MazeRunner:
         Parameters:
             move: The users input from a move prompt.
         """
+        # Invalid; reprompt
+        if not self._dispatch_move(move):
+            self._user_prompt()
+            return
+
+        if self._recorder is not None:
+            self._recorder.record(move)
+
+    def _dispatch_move(self, move: str) -> bool:
+        """ Applies a single move to the model, without prompting for
+            another if it's invalid.
+
+        Parameters:
+            move: The users input from a move prompt.
+
+        Returns:
+            True iff the move was a valid input.
+        """
         # Player has attempted to move
         if move in (UP, DOWN, LEFT, RIGHT):
             self._model.move_player(MOVE_DELTAS.get(move))
@@ -676,15 +1611,20 @@ class MazeRunner:
         # Player has attempted to use an item
         elif len(move) > 1 and move.split()[0] == 'i':
             item_name = move.partition(' ')[-1]
-            item = self._model.get_player().get_inventory().remove_item(item_name)
-            if item is not None:
-                item.apply(self._model.get_player())
-            else:
+            if not self._model.apply_item(item_name):
                 print('\nNo item with that name!\n')
-    
-        # Invalid; reprompt
+
+        # Player has attempted to undo or redo their last move or item use
+        elif move == UNDO:
+            if not self._model.undo():
+                print('\nNothing to undo!\n')
+        elif move == REDO:
+            if not self._model.redo():
+                print('\nNothing to redo!\n')
+
         else:
-            self._user_prompt()
+            return False
+        return True
 
     def play(self):
         """ Executes the entire game until a win or loss occurs. """
@@ -699,9 +1639,16 @@ class MazeRunner:
                 print(LOSS_MESSAGE)
                 break
 
+def text_interface() -> UserInterface:
+    """ Returns the text interface to play in. Terminals only need the
+        changes drawn after each move, within a window which fits on the
+        screen; other outputs get every frame in full.
+    """
+    return ViewportTextInterface() if sys.stdout.isatty() else TextInterface()
+
 def main():
     """ Entry-point to gameplay """
-    view = TextInterface()
+    view = text_interface()
     game_file = input('Enter game file: ')
     maze_runner = MazeRunner(game_file, view)
     maze_runner.play()
@@ -1,3 +1,7 @@
+import shutil
+import sys
+from typing import Optional, TextIO
+
 from constants import PLAYER
 
 class UserInterface:
@@ -54,6 +58,42 @@ class UserInterface:
         """
         raise NotImplementedError
 
+def render_frame(
+    maze: 'Maze',
+    items: dict[tuple[int, int], 'Item'],
+    player_position: tuple[int, int],
+    view: Optional[tuple[int, int, int, int]] = None
+) -> bytearray:
+    """ Returns the rows of the level as drawn by TextInterface, one byte per
+        cell with a newline after each row, so that row r column c is at
+        r * (#columns + 1) + c.
+
+    Parameters:
+        view: The (top, left, height, width) of the part of the level to
+              draw, with rows and columns counted from its corner. Defaults
+              to the whole level. The cost of drawing scales with its area.
+    """
+    top, left, height, width = view or (0, 0, *maze.get_dimensions())
+    bottom, right = top + height, left + width
+    stride = width + 1
+    frame = maze.get_window(top, left, height, width)
+    if len(items) <= height * width:
+        for (row, col), item in items.items():
+            if top <= row < bottom and left <= col < right:
+                frame[(row - top) * stride + col - left] = ord(item.get_id())
+    else:
+        get_item = items.get
+        for row in range(top, bottom):
+            offset = (row - top) * stride - left
+            for col in range(left, right):
+                item = get_item((row, col))
+                if item is not None:
+                    frame[offset + col] = ord(item.get_id())
+    row, col = player_position
+    if top <= row < bottom and left <= col < right:
+        frame[(row - top) * stride + col - left] = ord(PLAYER)
+    return frame
+
 class TextInterface(UserInterface):
     """ A MazeRunner interface that uses ascii to present information. """
     def _draw_level(
@@ -62,17 +102,8 @@ class TextInterface(UserInterface):
         items: dict[tuple[int, int], 'Item'],
         player_position: tuple[int, int]
     ) -> None:
-        num_rows, num_cols = maze.get_dimensions()
-        for row in range(num_rows):
-            row_str = ''
-            for col in range(num_cols):
-                if (row, col) == player_position:
-                    row_str += PLAYER
-                elif (row, col) in items:
-                    row_str += items.get((row, col)).get_id()
-                else:
-                    row_str += maze.get_tile((row, col)).get_id()
-            print(row_str)
+        frame = render_frame(maze, items, player_position)
+        print(frame.decode('latin-1'), end='')
     
     def _draw_inventory(self, inventory: 'Inventory') -> None:
         text = str(inventory) if inventory.get_items() != {} else 'Empty'
@@ -81,3 +112,230 @@ class TextInterface(UserInterface):
     def _draw_player_stats(self, player_stats: tuple[int, int, int]) -> None:
         hp, hunger, thirst = player_stats
         print(f'HP: {hp}\nhunger: {hunger}\nthirst: {thirst}')
+
+
+class BufferedTextInterface(TextInterface):
+    """ A TextInterface for ANSI terminals which keeps the previous frame and
+        only rewrites the cells and lines which changed since, using cursor
+        positioning. A new level, or a frame too tall for the terminal, is
+        written as a whole in a single write instead.
+    """
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        """ Sets up the interface.
+
+        Parameters:
+            stream: The terminal to write to. Defaults to sys.stdout.
+        """
+        self._stream = stream
+        self._maze = None # The maze in the previous frame
+        self._view = None # The (top, left, height, width) previously drawn
+        self._frame = None # The previous render_frame
+        self._player_position = None
+        self._unlocked = False
+        self._lines = [] # Lines below the maze
+
+    def draw(
+        self,
+        maze: 'Maze',
+        items: dict[tuple[int, int], 'Item'],
+        player_position: tuple[int, int],
+        inventory: 'Inventory',
+        player_stats: tuple[int, int, int]
+    ) -> None:
+        """ Draws the current game state, as in UserInterface.draw. """
+        text = str(inventory) if inventory.get_items() != {} else 'Empty'
+        hp, hunger, thirst = player_stats
+        lines = ('---------------\nInventory\n' + text + '\n---------------'
+                 f'\nHP: {hp}\nhunger: {hunger}\nthirst: {thirst}'
+                 ).split('\n')
+        view = self._get_view(maze, player_position, len(lines))
+        lines += self._get_summary(maze, player_position, view)
+
+        if view is not None and view == self._view and maze is self._maze:
+            output = self._draw_changes(maze, items, player_position, lines)
+        else:
+            output = self._draw_frame(maze, items, player_position, lines,
+                                      view)
+        self._maze = maze
+        self._view = view
+        self._player_position = player_position
+        self._unlocked = maze.is_unlocked()
+        self._lines = lines
+
+        # Leave the cursor below the frame, clearing any earlier prompt
+        height = view[2] if view is not None else maze.get_dimensions()[0]
+        stream = self._stream or sys.stdout
+        stream.write(output + f'\x1b[{height + len(lines) + 1};1H\x1b[J')
+        stream.flush()
+
+    def _get_view(
+        self,
+        maze: 'Maze',
+        player_position: tuple[int, int],
+        num_lines: int
+    ) -> Optional[tuple[int, int, int, int]]:
+        """ Returns the (top, left, height, width) of the part of the maze to
+            draw, or None to draw all of it without keeping track of changes.
+
+        Parameters:
+            num_lines: The number of lines to draw below the maze.
+        """
+        # Positions are relative to the screen, so the frame and the prompt
+        # under it must fit for only changes to be drawn
+        num_rows, num_cols = maze.get_dimensions()
+        if num_rows + num_lines + 2 > shutil.get_terminal_size().lines:
+            return None
+        return (0, 0, num_rows, num_cols)
+
+    def _get_summary(
+        self,
+        maze: 'Maze',
+        player_position: tuple[int, int],
+        view: Optional[tuple[int, int, int, int]]
+    ) -> list[str]:
+        """ Returns any extra lines to draw below the stats. """
+        return []
+
+    def _draw_frame(
+        self,
+        maze: 'Maze',
+        items: dict[tuple[int, int], 'Item'],
+        player_position: tuple[int, int],
+        lines: list[str],
+        view: Optional[tuple[int, int, int, int]]
+    ) -> str:
+        """ Returns the output which clears the screen and draws a whole frame.
+        """
+        self._frame = render_frame(maze, items, player_position, view)
+        return '\x1b[H\x1b[2J' + self._frame.decode('latin-1') \
+            + '\n'.join(lines)
+
+    def _draw_changes(
+        self,
+        maze: 'Maze',
+        items: dict[tuple[int, int], 'Item'],
+        player_position: tuple[int, int],
+        lines: list[str]
+    ) -> str:
+        """ Returns the output which updates the previous frame to this one.
+        """
+        # Only the player's old and new cells can change, as items are only
+        # collected or put back there, unless the doors were (un)locked
+        changed = {self._player_position, player_position}
+        if maze.is_unlocked() != self._unlocked:
+            changed.update(maze.get_door_positions())
+
+        top, left, height, width = self._view
+        output = []
+        for position in changed:
+            row, col = position[0] - top, position[1] - left
+            if not 0 <= row < height or not 0 <= col < width:
+                continue
+            if position == player_position:
+                char = PLAYER
+            elif position in items:
+                char = items[position].get_id()
+            else:
+                char = maze.get_tile(position).get_id()
+            index = row * (width + 1) + col
+            if self._frame[index] != ord(char):
+                self._frame[index] = ord(char)
+                output.append(f'\x1b[{row + 1};{col + 1}H{char}')
+
+        for line_num, line in enumerate(lines):
+            if line_num >= len(self._lines) or line != self._lines[line_num]:
+                output.append(
+                    f'\x1b[{height + line_num + 1};1H{line}\x1b[K'
+                )
+        return ''.join(output)
+
+
+class ViewportTextInterface(BufferedTextInterface):
+    """ A BufferedTextInterface which draws only a window of the maze around
+        the player, sized to fit the terminal, with a summary line showing
+        where the window is. The window stays put until the player comes
+        near its edge, so most moves still only redraw a few cells, and the
+        cost of a frame depends on the window's size rather than the maze's.
+    """
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        size: Optional[tuple[int, int]] = None
+    ) -> None:
+        """ Sets up the interface.
+
+        Parameters:
+            stream: The terminal to write to. Defaults to sys.stdout.
+            size: The (#rows, #columns) of the window. Defaults to as much of
+                  the terminal as the frame can use.
+        """
+        super().__init__(stream)
+        self._size = size
+
+    def _get_view(
+        self,
+        maze: 'Maze',
+        player_position: tuple[int, int],
+        num_lines: int
+    ) -> Optional[tuple[int, int, int, int]]:
+        num_rows, num_cols = maze.get_dimensions()
+        if self._size is not None:
+            height, width = self._size
+        else:
+            # Leave room for the summary line and the prompt
+            columns, terminal_lines = shutil.get_terminal_size()
+            height, width = terminal_lines - num_lines - 3, columns
+        height = max(1, min(height, num_rows))
+        width = max(1, min(width, num_cols))
+
+        # Keep the previous window while the player is away from its edges,
+        # unless they're at the edge of the maze itself
+        row, col = player_position
+        if self._view is not None and maze is self._maze \
+            and self._view[2:] == (height, width):
+            top, left = self._view[:2]
+            row_margin, col_margin = height // 4, width // 4
+            if (top + row_margin <= row < top + height - row_margin
+                    or top == 0 and row < top + height - row_margin
+                    or top + height == num_rows and row >= top + row_margin) \
+                and (left + col_margin <= col < left + width - col_margin
+                     or left == 0 and col < left + width - col_margin
+                     or left + width == num_cols
+                     and col >= left + col_margin):
+                return self._view
+
+        # Otherwise centre the window on the player
+        top = max(0, min(row - height // 2, num_rows - height))
+        left = max(0, min(col - width // 2, num_cols - width))
+        return (top, left, height, width)
+
+    def _get_summary(
+        self,
+        maze: 'Maze',
+        player_position: tuple[int, int],
+        view: Optional[tuple[int, int, int, int]]
+    ) -> list[str]:
+        """ Returns a minimap line, with a bar for each axis marking the part
+            of the maze in the window.
+        """
+        num_rows, num_cols = maze.get_dimensions()
+        top, left, height, width = view
+        row, col = player_position
+        return [
+            f'Rows {top + 1}-{top + height}/{num_rows} '
+            f'{_minimap_bar(top, height, num_rows)} '
+            f'Cols {left + 1}-{left + width}/{num_cols} '
+            f'{_minimap_bar(left, width, num_cols)} '
+            f'Player ({row}, {col})'
+        ]
+
+
+def _minimap_bar(start: int, length: int, total: int, size: int = 10) -> str:
+    """ Returns a bar of the given size with '#' marking the span from start
+        to start + length out of total, and '-' elsewhere.
+    """
+    first = start * size // total
+    last = max(first, min(size - 1, (start + length - 1) * size // total))
+    return '[' + '-' * first + '#' * (last - first + 1) \
+        + '-' * (size - last - 1) + ']'
+
@@ -0,0 +1,365 @@
+from __future__ import annotations
+import random
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from a2_solution import *
+from engine import CompiledLevel, ESCAPE, ITEM_IDS
+
+# Action codes. Codes 0-3 move the player in the order of MOVE_DELTAS; code
+# USE_ITEM + k uses one item with ID ITEM_IDS[k + 1].
+MOVES = tuple(MOVE_DELTAS)
+USE_ITEM = len(MOVES)
+NO_OP = -1
+ITEM_NAMES = tuple(Level.ENTITIES[item_id].__name__
+                   for item_id in ITEM_IDS[1:])
+COMMAND_CODES = {move: code for code, move in enumerate(MOVES)}
+COMMAND_CODES.update({f'i {name}': USE_ITEM + kind
+                      for kind, name in enumerate(ITEM_NAMES)})
+
+
+def encode_actions(sequences: Sequence[Iterable[str]],
+                   length: Optional[int] = None) -> np.ndarray:
+    """ Encodes command sequences into an array of action codes.
+
+    Parameters:
+        sequences: One sequence of commands per game. Commands are those
+                   accepted by MazeRunner._handle_move, e.g. 'w' or
+                   'i Potion', so a plain move string such as 'wwdd' works.
+        length: The number of steps to encode. Defaults to the length of the
+                longest sequence. Shorter sequences are padded with NO_OP.
+
+    Returns:
+        An int8 array of shape (#sequences, length). Unknown commands are
+        encoded as NO_OP, as MazeRunner ignores them.
+    """
+    sequences = [list(sequence) for sequence in sequences]
+    if length is None:
+        length = max((len(sequence) for sequence in sequences), default=0)
+    actions = np.full((len(sequences), length), NO_OP, dtype=np.int8)
+    for game, sequence in enumerate(sequences):
+        for step, command in enumerate(sequence[:length]):
+            actions[game, step] = COMMAND_CODES.get(command, NO_OP)
+    return actions
+
+
+class BatchSimulator:
+    """ Advances many independent games of one game file in lockstep. Every
+        piece of game state is a NumPy array with one entry per game, so each
+        step is a handful of vectorised operations across all games.
+
+        The rules match Model.move_player and MazeRunner._handle_move. The
+        amounts from constants.py can be overridden with either a scalar or
+        an array giving a value per game, to sweep over them.
+    """
+    def __init__(
+        self,
+        game_file: str,
+        num_games: int,
+        lava_damage=LAVA_DAMAGE,
+        potion_amount=POTION_AMOUNT,
+        apple_amount=APPLE_AMOUNT,
+        honey_amount=HONEY_AMOUNT,
+        water_amount=WATER_AMOUNT,
+    ) -> None:
+        """ Loads the game file and sets up num_games new games.
+
+        Parameters:
+            game_file: The file containing the levels for this game.
+            num_games: The number of games to simulate at once.
+            lava_damage: Extra HP lost when stepping onto lava.
+            potion_amount: HP gained from using a potion.
+            apple_amount: Change in hunger from using an apple.
+            honey_amount: Change in hunger from using honey.
+            water_amount: Change in thirst from using water.
+        """
+        self._game_file = game_file
+        self._num_games = num_games
+        self._build_levels(load_game(game_file))
+
+        def per_game(value) -> np.ndarray:
+            return np.broadcast_to(np.asarray(value, dtype=np.int32),
+                                   (num_games,))
+        self._lava_damage = per_game(lava_damage)
+        kind_amounts = {
+            POTION: per_game(potion_amount),
+            APPLE: per_game(apple_amount),
+            HONEY: per_game(honey_amount),
+            WATER: per_game(water_amount),
+        }
+        self._item_amounts = [kind_amounts.get(item_id)
+                              for item_id in ITEM_IDS[1:]]
+        self.reset()
+
+    def _build_levels(self, levels: list[Level]) -> None:
+        """ Lays out every level's cells one after another in flat arrays, so
+            a single global cell number identifies a cell in any level.
+
+        Parameters:
+            levels: The freshly loaded levels of the game.
+        """
+        offsets, num_cols, starts, coins = [], [], [], []
+        neighbours = [[] for _ in MOVES]
+        walls, lava, doors, item_kinds, cell_items = [], [], [], [], []
+        offset = 0
+        for level in levels:
+            compiled = CompiledLevel(level)
+            rows, cols = level.get_dimensions()
+            offsets.append(offset)
+            num_cols.append(cols)
+            starts.append(offset + compiled.start)
+            coins.append(level.get_item_count(COIN))
+
+            for code, move in enumerate(MOVES):
+                neighbours[code].extend(
+                    target + offset if target >= 0 else target
+                    for target in compiled.neighbours[move]
+                )
+            maze = level.get_maze()
+            for row in maze.get_tiles():
+                for tile in row:
+                    walls.append(tile.get_id() == WALL)
+                    lava.append(tile.get_id() == LAVA)
+            level_doors = [False] * (rows * cols)
+            for row, col in maze.get_door_positions():
+                level_doors[row * cols + col] = True
+            doors.extend(level_doors)
+
+            for cell, code in enumerate(compiled.items):
+                if code:
+                    cell_items.append(len(item_kinds))
+                    item_kinds.append(code - 1)
+                else:
+                    cell_items.append(-1)
+            offset += rows * cols
+
+        self._num_levels = len(levels)
+        self._offsets = np.array(offsets + [offset], dtype=np.int64)
+        self._num_cols = np.array(num_cols, dtype=np.int64)
+        self._starts = np.array(starts, dtype=np.int64)
+        self._level_coins = np.array(coins, dtype=np.int32)
+        self._neighbours = np.array(neighbours, dtype=np.int64)
+        self._walls = np.array(walls, dtype=bool)
+        self._lava = np.array(lava, dtype=bool)
+        self._doors = np.array(doors, dtype=bool)
+        self._cell_items = np.array(cell_items, dtype=np.int64)
+        self._item_kinds = np.array(item_kinds, dtype=np.int64)
+        self._coin_kind = ITEM_IDS.index(COIN) - 1
+
+    def reset(self) -> None:
+        """ Restarts every game from the start of the first level. """
+        n = self._num_games
+        self._step = 0
+        self._level = np.zeros(n, dtype=np.int64)
+        self._pos = np.full(n, self._starts[0], dtype=np.int64)
+        self._hp = np.full(n, MAX_HEALTH, dtype=np.int32)
+        self._hunger = np.zeros(n, dtype=np.int32)
+        self._thirst = np.zeros(n, dtype=np.int32)
+        self._num_moves = np.zeros(n, dtype=np.int64)
+        self._coins = np.full(n, self._level_coins[0], dtype=np.int32)
+        self._unlocked = np.zeros(n, dtype=bool)
+        self._items_left = np.ones((n, len(self._item_kinds)), dtype=bool)
+        self._inventory = np.zeros((n, len(ITEM_NAMES)), dtype=np.int32)
+        self._won = np.zeros(n, dtype=bool)
+        self._lost = np.zeros(n, dtype=bool)
+        self._end_index = np.full(n, -1, dtype=np.int64)
+
+    def step(self, actions: np.ndarray) -> None:
+        """ Applies one action to every game which hasn't finished yet.
+
+        Parameters:
+            actions: Array with one action code per game.
+        """
+        actions = np.asarray(actions)
+        active = ~(self._won | self._lost)
+        moving = np.flatnonzero(active & (actions >= 0) & (actions < USE_ITEM))
+        if len(moving):
+            self._move(moving, actions[moving])
+        using = np.flatnonzero(active & (actions >= USE_ITEM))
+        if len(using):
+            self._use_items(using, actions[using] - USE_ITEM)
+
+        finished = active & (self._won | self._lost)
+        self._end_index[finished] = self._step
+        self._step += 1
+
+    def _move(self, games: np.ndarray, moves: np.ndarray) -> None:
+        """ Attempts to move the player in each of the given games.
+
+        Parameters:
+            games: Indices of the games making a move.
+            moves: The move code for each of those games.
+        """
+        targets = self._neighbours[moves, self._pos[games]]
+
+        escaping = games[targets == ESCAPE]
+        if len(escaping):
+            self._level[escaping] += 1
+            self._won[escaping] = self._level[escaping] >= self._num_levels
+            playing = escaping[~self._won[escaping]]
+            self._pos[playing] = self._starts[self._level[playing]]
+            self._coins[playing] = self._level_coins[self._level[playing]]
+            self._unlocked[playing] = False
+
+        on_grid = targets >= 0
+        games, targets = games[on_grid], targets[on_grid]
+        blocked = self._walls[targets] \
+            | (self._doors[targets] & ~self._unlocked[games])
+        games, targets = games[~blocked], targets[~blocked]
+        if not len(games):
+            return
+
+        self._num_moves[games] += 1
+        tired = games[self._num_moves[games] % 5 == 0]
+        self._hunger[tired] = np.minimum(self._hunger[tired] + 1, MAX_HUNGER)
+        self._thirst[tired] = np.minimum(self._thirst[tired] + 1, MAX_THIRST)
+        damage = 1 + np.where(self._lava[targets], self._lava_damage[games], 0)
+        self._hp[games] = np.clip(self._hp[games] - damage, 0, MAX_HEALTH)
+        self._pos[games] = targets
+
+        items = self._cell_items[targets]
+        has_item = items >= 0
+        has_item[has_item] = self._items_left[games[has_item], items[has_item]]
+        collectors, items = games[has_item], items[has_item]
+        self._items_left[collectors, items] = False
+        kinds = self._item_kinds[items]
+        np.add.at(self._inventory, (collectors, kinds), 1)
+        np.subtract.at(self._coins, collectors[kinds == self._coin_kind], 1)
+        self._unlocked[games] |= self._coins[games] == 0
+
+        self._lost[games] |= (self._hp[games] <= 0) \
+            | (self._hunger[games] >= MAX_HUNGER) \
+            | (self._thirst[games] >= MAX_THIRST)
+
+    def _use_items(self, games: np.ndarray, kinds: np.ndarray) -> None:
+        """ Uses one item from the inventory in each of the given games, if
+            the player has one of that kind.
+
+        Parameters:
+            games: Indices of the games using an item.
+            kinds: The item kind used in each of those games.
+        """
+        owned = self._inventory[games, kinds] > 0
+        games, kinds = games[owned], kinds[owned]
+        self._inventory[games, kinds] -= 1
+        for kind, amounts in enumerate(self._item_amounts):
+            users = games[kinds == kind]
+            if amounts is None or not len(users):
+                continue
+            item_id = ITEM_IDS[kind + 1]
+            if item_id == POTION:
+                stat, bound = self._hp, MAX_HEALTH
+            elif item_id == WATER:
+                stat, bound = self._thirst, MAX_THIRST
+            else:
+                stat, bound = self._hunger, MAX_HUNGER
+            stat[users] = np.clip(stat[users] + amounts[users], 0, bound)
+        self._lost[games] |= (self._hp[games] <= 0) \
+            | (self._hunger[games] >= MAX_HUNGER) \
+            | (self._thirst[games] >= MAX_THIRST)
+
+    def run(self, actions: np.ndarray) -> None:
+        """ Applies a sequence of actions to every game, stopping early once
+            all the games have finished.
+
+        Parameters:
+            actions: Array of shape (#games, #steps) of action codes, as made
+                     by encode_actions.
+        """
+        for step_actions in np.asarray(actions).T:
+            if (self._won | self._lost).all():
+                break
+            self.step(step_actions)
+
+    def get_positions(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Returns arrays of each player's (level number, row, column). The
+            level number of a won game is the number of levels.
+        """
+        level = np.minimum(self._level, self._num_levels - 1)
+        rows, cols = np.divmod(self._pos - self._offsets[level],
+                               self._num_cols[level])
+        return self._level.copy(), rows, cols
+
+    def get_stats(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Returns arrays of each player's (HP, hunger, thirst). """
+        return self._hp.copy(), self._hunger.copy(), self._thirst.copy()
+
+    def get_inventories(self) -> np.ndarray:
+        """ Returns an array of shape (#games, #item kinds) of the number of
+            each item held. Columns are in the order of ITEM_NAMES.
+        """
+        return self._inventory.copy()
+
+    def get_num_moves(self) -> np.ndarray:
+        """ Returns the number of successful moves made in each game. """
+        return self._num_moves.copy()
+
+    def get_outcomes(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Returns arrays of (won, lost, end index) for each game. The end
+            index is the step at which the game finished, or -1 if it hasn't.
+        """
+        return self._won.copy(), self._lost.copy(), self._end_index.copy()
+
+    def __repr__(self) -> str:
+        return f"BatchSimulator('{self._game_file}', {self._num_games})"
+
+
+def check_against_model(game_file: str, num_games: int = 200,
+                        length: int = 300, seed: int = 0) -> list[int]:
+    """ Plays random command sequences through both the BatchSimulator and
+        Model, and reports the games whose final states disagree.
+
+    Parameters:
+        game_file: The file containing the levels for this game.
+        num_games: The number of random games to play.
+        length: The number of commands in each game.
+        seed: Seed for generating the commands.
+
+    Returns:
+        The indices of the games which disagree.
+    """
+    rng = random.Random(seed)
+    commands = list(COMMAND_CODES) + ['x']
+    weights = [4] * len(MOVES) + [1] * (len(commands) - len(MOVES))
+    sequences = [rng.choices(commands, weights, k=length)
+                 for _ in range(num_games)]
+
+    simulator = BatchSimulator(game_file, num_games)
+    simulator.run(encode_actions(sequences))
+    levels, rows, cols = simulator.get_positions()
+    hp, hunger, thirst = simulator.get_stats()
+    inventories = simulator.get_inventories()
+    won, lost, end_index = simulator.get_outcomes()
+
+    mismatches = []
+    for game, sequence in enumerate(sequences):
+        model = Model(game_file)
+        expected_end = -1
+        for step, command in enumerate(sequence):
+            if command in MOVE_DELTAS:
+                model.move_player(MOVE_DELTAS[command])
+            elif command in COMMAND_CODES:
+                item_name = command.partition(' ')[-1]
+                item = model.get_player_inventory().remove_item(item_name)
+                if item is not None:
+                    item.apply(model.get_player())
+            if model.has_won() or model.has_lost():
+                expected_end = step
+                break
+        inventory = model.get_player_inventory().get_items()
+        expected = (
+            model._level_num, model.get_player().get_position(),
+            model.get_player_stats(),
+            [len(inventory.get(name, [])) for name in ITEM_NAMES],
+            model.has_won(), model.has_lost(), expected_end,
+        )
+        actual = (
+            int(levels[game]), (int(rows[game]), int(cols[game])),
+            (int(hp[game]), int(hunger[game]), int(thirst[game])),
+            [int(count) for count in inventories[game]],
+            bool(won[game]), bool(lost[game]), int(end_index[game]),
+        )
+        if actual != expected:
+            mismatches.append(game)
+    return mismatches
@@ -0,0 +1,804 @@
+from __future__ import annotations
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import tkinter as tk
+import types
+from typing import Callable
+
+from a2_solution import *
+from a2_support import TextInterface, ViewportTextInterface, render_frame
+from engine import HeadlessEngine
+import a3
+from a3 import ImageLevelView, SpriteCache
+from generator import write_game
+
+# Metric names end in their unit. Times and sizes are better lower, rates
+# higher; anything else is a count, reported but not compared.
+LOWER_IS_BETTER = ('_s', '_ms', '_us', '_ns', '_bytes')
+HIGHER_IS_BETTER = ('_per_s',)
+
+# The relative change in a metric past which compare flags it.
+REGRESSION_THRESHOLD = 0.1
+
+# The largest maze, in cells, drawn by ImageLevelView. Only the cells around
+# the player are drawn, but draw is still passed a Tile for every cell.
+IMAGE_VIEW_MAX_CELLS = 200 * 200
+
+
+def random_maze_rows(size: int, seed: int = 0) -> list[str]:
+    """ Creates the rows of a square maze with a wall border, randomly placed
+        walls, lava and coins, a player start and a door.
+
+    Parameters:
+        size: The number of rows and columns in the maze.
+        seed: Seed for the random placement of tiles and items.
+
+    Returns:
+        A list of row strings in the game file format.
+    """
+    rng = random.Random(seed)
+    population = (EMPTY, WALL, LAVA, COIN)
+    weights = (70, 20, 5, 5)
+    rows = [WALL * size]
+    for _ in range(size - 2):
+        inner = rng.choices(population, weights, k=size - 2)
+        rows.append(WALL + ''.join(inner) + WALL)
+    rows.append(WALL * size)
+    rows[1] = PLAYER + rows[1][1:]
+    rows[-2] = rows[-2][:-1] + DOOR
+    return rows
+
+
+def write_game_file(filename: str, size: int, num_levels: int = 1) -> None:
+    """ Writes a game file of random square mazes.
+
+    Parameters:
+        filename: The path to write the game file to.
+        size: The number of rows and columns in each maze.
+        num_levels: The number of levels in the game.
+    """
+    with open(filename, 'w') as file:
+        for level_num in range(num_levels):
+            file.write(f'Maze {level_num + 1} - {size} {size}\n')
+            file.write('\n'.join(random_maze_rows(size, seed=level_num)))
+            file.write('\n\n')
+
+
+def item_maze_rows(size: int, seed: int = 0) -> list[str]:
+    """ Creates the rows of a square maze like random_maze_rows, but with an
+        item on every cell which isn't a wall.
+
+    Parameters:
+        size: The number of rows and columns in the maze.
+        seed: Seed for the random placement of tiles and items.
+    """
+    rng = random.Random(seed)
+    item_ids = tuple(Level.ENTITIES)
+    rows = random_maze_rows(size, seed)
+    return [row[:1] + ''.join(tile if tile == WALL else rng.choice(item_ids)
+                              for tile in row[1:-1]) + row[-1:]
+            if 0 < row_num < size - 1 else row
+            for row_num, row in enumerate(rows)]
+
+
+# Subclasses of each item without __slots__, so that their instances carry a
+# __dict__ like the original classes' did.
+UNSLOTTED_ITEMS = {item: type(item.__name__, (item,), {})
+                   for item in Level.ENTITIES.values()}
+
+
+def legacy_tiles(rows: list[str]) -> list[list[Tile]]:
+    """ Builds the original maze layout, with a new Tile instance per cell.
+
+    Parameters:
+        rows: The rows of tile IDs in the maze.
+    """
+    return [[Maze.TILES.get(tile, Empty)() for tile in row] for row in rows]
+
+
+def array_maze(rows: list[str]) -> Maze:
+    """ Builds the array-backed Maze for the given rows.
+
+    Parameters:
+        rows: The rows of tile IDs in the maze.
+    """
+    maze = Maze((len(rows), len(rows[0])))
+    for row in rows:
+        maze.add_row(row)
+    return maze
+
+
+def measure(build: Callable[[], object]) -> tuple[float, int, object]:
+    """ Times a build function and traces the memory it allocates.
+
+    Parameters:
+        build: A function taking no arguments which builds some structure.
+
+    Returns:
+        The (seconds taken, peak bytes allocated, built structure).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def time_per_call(func: Callable[[], object], min_seconds: float = 0.2,
+                  rounds: int = 3) -> float:
+    """ Returns the seconds a call to func takes, as the best over several
+        rounds of the mean time per call, calling it for at least
+        min_seconds each round.
+
+    Parameters:
+        func: The function to time, taking no arguments.
+        min_seconds: The least time to spend calling func each round.
+        rounds: The number of rounds to take the best of.
+    """
+    best = float('inf')
+    for _ in range(rounds):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds:
+                break
+        best = min(best, elapsed / calls)
+    return best
+
+
+def bench_maze_layout(size: int, lookups: int = 100000) -> dict[str, dict]:
+    """ Compares building and reading a size x size maze stored as nested
+        lists of Tile instances against the array-backed Maze.
+
+    Parameters:
+        size: The number of rows and columns in the maze.
+        lookups: The number of random tile lookups to time.
+
+    Returns:
+        Maps each layout name to its build time, peak memory and lookup time.
+    """
+    rows = random_maze_rows(size)
+    rng = random.Random(1)
+    positions = [(rng.randrange(size), rng.randrange(size))
+                 for _ in range(lookups)]
+    results = {}
+
+    seconds, peak, tiles = measure(lambda: legacy_tiles(rows))
+    start = time.perf_counter()
+    for row, col in positions:
+        tiles[row][col].is_blocking()
+    results['nested lists'] = {
+        'build_s': seconds,
+        'peak_bytes': peak,
+        'lookup_ns': (time.perf_counter() - start) / lookups * 1e9,
+    }
+    del tiles
+
+    seconds, peak, maze = measure(lambda: array_maze(rows))
+    start = time.perf_counter()
+    for position in positions:
+        maze.get_tile(position).is_blocking()
+    results['array'] = {
+        'build_s': seconds,
+        'peak_bytes': peak,
+        'lookup_ns': (time.perf_counter() - start) / lookups * 1e9,
+    }
+    return results
+
+
+def bench_entity_memory(size: int) -> dict[str, float]:
+    """ Measures the memory taken by the items of a size x size level with an
+        item on almost every cell, as slotted instances and as instances
+        carrying a __dict__.
+
+    Parameters:
+        size: The number of rows and columns in the maze.
+
+    Returns:
+        The number of items, the peak memory allocated loading the level, and
+        the bytes per item of each kind of instance.
+    """
+    rows = item_maze_rows(size)
+    level = Level((size, size))
+    _, load_peak, _ = measure(lambda: [level.add_row(row) for row in rows])
+    positions = [(position, type(item))
+                 for position, item in level.get_items().items()]
+    del level
+
+    results = {'items': len(positions), 'load_peak_bytes': load_peak}
+    for name, kinds in (('slotted', None), ('dict', UNSLOTTED_ITEMS)):
+        tracemalloc.start()
+        items = [item(position) if kinds is None else kinds[item](position)
+                 for position, item in positions]
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del items
+        results[f'{name}_item_bytes'] = retained / len(positions)
+    return results
+
+
+def bench_engine(game_file: str, num_sequences: int = 2000,
+                 length: int = 2000) -> dict[str, float]:
+    """ Measures how quickly the headless engine replays random move
+        sequences against a game file.
+
+    Parameters:
+        game_file: The game file to replay the moves against.
+        num_sequences: The number of random move sequences to replay.
+        length: The number of moves in each sequence.
+
+    Returns:
+        The number of moves applied, time taken and moves per second. Moves
+        after a game ends are not counted.
+    """
+    engine = HeadlessEngine(game_file)
+    rng = random.Random(2)
+    sequences = [''.join(rng.choices(tuple(MOVE_DELTAS), k=length))
+                 for _ in range(num_sequences)]
+    start = time.perf_counter()
+    results = engine.run_many(sequences)
+    elapsed = time.perf_counter() - start
+    num_moves = sum(length if result.end_index is None
+                    else result.end_index + 1 for result in results)
+    return {
+        'moves': num_moves,
+        'run_s': elapsed,
+        'moves_per_s': num_moves / elapsed,
+    }
+
+
+def bench_restart(size: int, repeats: int = 20) -> dict[str, float]:
+    """ Compares restarting a game by constructing a new Model, which reads
+        and parses the game file, against Model.restart.
+
+    Parameters:
+        size: The number of rows and columns in the generated maze.
+        repeats: The number of restarts to time.
+
+    Returns:
+        The mean latency in seconds of each way of restarting.
+    """
+    handle, filename = tempfile.mkstemp(suffix='.txt')
+    os.close(handle)
+    try:
+        write_game_file(filename, size)
+        model = Model(filename)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            Model(filename)
+        reload = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for move in 'dsdsdsds':
+                model.move_player(MOVE_DELTAS[move])
+            model.restart()
+        restart = (time.perf_counter() - start) / repeats
+    finally:
+        os.remove(filename)
+    return {'new_model_s': reload, 'restart_s': restart}
+
+
+def bench_viewport(size: int, frames: int = 10000,
+                   window: tuple[int, int] = (40, 120)) -> dict[str, float]:
+    """ Measures drawing consecutive frames of a size x size maze through a
+        ViewportTextInterface, with the player walking diagonally across the
+        maze, against rendering the whole maze once.
+
+    Parameters:
+        size: The number of rows and columns in the generated maze.
+        frames: The number of frames to draw.
+        window: The (#rows, #columns) of the viewport.
+
+    Returns:
+        The mean time and output per viewport frame, and the time taken to
+        render the whole maze.
+    """
+    handle, filename = tempfile.mkstemp(suffix='.txt')
+    os.close(handle)
+    try:
+        write_game_file(filename, size)
+        model = Model(filename)
+    finally:
+        os.remove(filename)
+    maze, items = model.get_current_maze(), model.get_current_items()
+    inventory, stats = model.get_player_inventory(), model.get_player_stats()
+
+    positions = [(min(frame // 2, size - 1), min((frame + 1) // 2, size - 1))
+                 for frame in range(frames)]
+    stream = io.StringIO()
+    view = ViewportTextInterface(stream, window)
+    num_bytes = 0
+    start = time.perf_counter()
+    for position in positions:
+        view.draw(maze, items, position, inventory, stats)
+        num_bytes += stream.tell()
+        stream.seek(0)
+        stream.truncate()
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    render_frame(maze, items, positions[-1])
+    full = time.perf_counter() - start
+    return {
+        'frame_ms': elapsed / frames * 1e3,
+        'frame_bytes': num_bytes / frames,
+        'full_frame_ms': full * 1e3,
+    }
+
+
+class StubCanvasImageLevelView(ImageLevelView):
+    """ An ImageLevelView which draws onto a stub rather than a Tk canvas,
+        counting the canvas items created, so that drawing can be timed
+        without a display.
+    """
+    def __init__(self, dimensions: tuple[int, int],
+                 size: tuple[int, int] = (MAZE_WIDTH, MAZE_HEIGHT)) -> None:
+        """ Sets up the grid geometry, without creating a Tk canvas.
+
+        Parameters:
+            dimensions: (#rows, #columns)
+            size: (width in pixels, height in pixels)
+        """
+        self._size = size
+        self._zoom = 1
+        self.set_dimensions(dimensions)
+        self._sprites = SpriteCache()
+        self._live_sprites = dict()
+        self.num_items = 0
+
+    def _create(self, *args, **kwargs) -> int:
+        self.num_items += 1
+        return self.num_items
+
+    create_image = create_rectangle = create_oval = create_text = _create
+
+    def _change(self, *args, **kwargs) -> None:
+        pass
+
+    configure = itemconfigure = move = tag_raise = tag_lower = _change
+    xview_moveto = yview_moveto = _change
+
+    def delete(self, *tags) -> None:
+        if tags == ('all',):
+            self.num_items = 0
+        else:
+            self.num_items -= len(tags)
+
+
+@contextlib.contextmanager
+def photo_images():
+    """ Lets ImageLevelView create its PhotoImages: real ones through a hidden
+        Tk root if there's a display, or else stand-ins which just keep the
+        resized image. Yields True iff they're real.
+    """
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        root = None
+    if root is not None:
+        root.withdraw()
+        try:
+            yield True
+        finally:
+            root.destroy()
+        return
+
+    image_tk = a3.ImageTk
+    a3.ImageTk = types.SimpleNamespace(PhotoImage=lambda image: image)
+    try:
+        yield False
+    finally:
+        a3.ImageTk = image_tk
+
+
+def bench_load(game_file: str) -> dict[str, float]:
+    """ Measures reading a game file with load_game and constructing a Model
+        from it.
+
+    Parameters:
+        game_file: The game file to load.
+
+    Returns:
+        The seconds taken by each, and the number of cells in the game.
+    """
+    levels = load_game(game_file)
+    return {
+        'cells': sum(rows * cols for rows, cols
+                     in (level.get_dimensions() for level in levels)),
+        'load_game_s': time_per_call(lambda: load_game(game_file)),
+        'new_model_s': time_per_call(lambda: Model(game_file)),
+    }
+
+
+def bench_moves(game_file: str, num_moves: int = 20000) -> dict[str, float]:
+    """ Measures Model.move_player throughput over random moves, restarting
+        the game whenever it's won or lost.
+
+    Parameters:
+        game_file: The game file to play.
+        num_moves: The number of moves to time in each round.
+
+    Returns:
+        The moves per second and mean time per move.
+    """
+    model = Model(game_file)
+    rng = random.Random(3)
+    moves = [MOVE_DELTAS[key]
+             for key in rng.choices(tuple(MOVE_DELTAS), k=num_moves)]
+
+    def play():
+        model.restart()
+        for delta in moves:
+            model.move_player(delta)
+            if model.has_won() or model.has_lost():
+                model.restart()
+
+    seconds = time_per_call(play, min_seconds=0)
+    return {
+        'moves_per_s': num_moves / seconds,
+        'move_us': seconds / num_moves * 1e6,
+    }
+
+
+def bench_text_draw(game_file: str) -> dict[str, float]:
+    """ Measures drawing the start of a game with TextInterface.draw, printing
+        to an in-memory stream.
+
+    Parameters:
+        game_file: The game file to draw.
+
+    Returns:
+        The time taken and output written by each draw.
+    """
+    model = Model(game_file)
+    view = TextInterface()
+    stream = io.StringIO()
+
+    def draw():
+        stream.seek(0)
+        stream.truncate()
+        with contextlib.redirect_stdout(stream):
+            view.draw(
+                model.get_current_maze(),
+                model.get_current_items(),
+                model.get_player().get_position(),
+                model.get_player_inventory(),
+                model.get_player_stats(),
+            )
+
+    seconds = time_per_call(draw)
+    return {'draw_ms': seconds * 1e3, 'frame_bytes': stream.tell()}
+
+
+def bench_image_view(game_file: str) -> dict[str, float]:
+    """ Measures drawing the start of a game with ImageLevelView.draw onto a
+        stub canvas, clearing it before each draw as GraphicalInterface does.
+        Must be run within photo_images().
+
+    Parameters:
+        game_file: The game file to draw.
+
+    Returns:
+        The time taken by the first draw, which loads the sprites, and by
+        each draw after, the canvas items each creates, and the time taken
+        to update the drawing after the player moves.
+    """
+    model = Model(game_file)
+    maze, items = model.get_current_maze(), model.get_current_items()
+    position = model.get_player().get_position()
+    view = StubCanvasImageLevelView(maze.get_dimensions())
+
+    def draw():
+        view.delete('all')
+        view.draw(maze.get_tiles(), items, position)
+
+    start = time.perf_counter()
+    draw()
+    first = time.perf_counter() - start
+    seconds = time_per_call(draw)
+    num_items = view.num_items
+
+    # Step the player back and forth, as the game redraws after each move
+    row, col = position
+    positions = [(row, col), (row, col + 1)]
+    view.update(maze, items, position)
+
+    def update():
+        positions.reverse()
+        view.update(maze, items, positions[0])
+
+    return {
+        'first_draw_ms': first * 1e3,
+        'draw_ms': seconds * 1e3,
+        'update_us': time_per_call(update) * 1e6,
+        'canvas_items': num_items,
+    }
+
+
+def bench_zoom(game_file: str) -> dict[str, float]:
+    """ Measures drawing the start of a game with ImageLevelView at each
+        zoom from 1 to MAX_ZOOM onto a stub canvas, as after zooming in or
+        out. Drawing the corners of the maze at every zoom first also checks
+        that the chunks at its edges can be drawn. Must be run within
+        photo_images().
+
+    Parameters:
+        game_file: The game file to draw.
+
+    Returns:
+        The time taken to draw at each zoom, and to update the drawing after
+        the player moves at the furthest zoom.
+    """
+    model = Model(game_file)
+    maze, items = model.get_current_maze(), model.get_current_items()
+    position = model.get_player().get_position()
+    view = StubCanvasImageLevelView(maze.get_dimensions())
+    view.update(maze, items, position) # Loads the sprites
+
+    # Follow the player into each corner at every zoom first, so the chunks
+    # at the edges of the maze, whose blocks are cut short, are drawn too
+    rows, cols = maze.get_dimensions()
+    corners = [(0, 0), (0, cols - 1), (rows - 1, 0), (rows - 1, cols - 1)]
+    zoom = 1
+    while zoom <= MAX_ZOOM:
+        view.set_zoom(zoom)
+        for corner in corners:
+            view.update(maze, items, corner)
+        zoom *= 2
+
+    results = {}
+    zoom = 1
+    while zoom <= MAX_ZOOM:
+        view.set_zoom(zoom)
+
+        def draw():
+            view.set_dimensions(maze.get_dimensions()) # Draws from scratch
+            view.update(maze, items, position)
+        results[f'draw_{zoom}x_ms'] = time_per_call(draw) * 1e3
+        zoom *= 2
+
+    # Step the player back and forth, as the game redraws after each move
+    row, col = position
+    positions = [(row, col), (row, col + 1)]
+
+    def update():
+        positions.reverse()
+        view.update(maze, items, positions[0])
+
+    results[f'update_{MAX_ZOOM}x_us'] = time_per_call(update) * 1e6
+    return results
+
+
+def bench_inventory(num_items: int = 10000) -> dict[str, float]:
+    """ Measures adding, counting and removing items in an Inventory.
+
+    Parameters:
+        num_items: The number of random items to add and remove.
+
+    Returns:
+        The mean time of each operation, and of copying the full inventory.
+    """
+    rng = random.Random(4)
+    kinds = list(Level.ENTITIES.values())
+    items = [rng.choice(kinds)((0, 0)) for _ in range(num_items)]
+    names = [item.get_name() for item in items]
+
+    def fill() -> Inventory:
+        inventory = Inventory()
+        for item in items:
+            inventory.add_item(item)
+        return inventory
+
+    full = fill()
+
+    def drain():
+        inventory = full.copy()
+        for name in names:
+            inventory.remove_item(name)
+
+    add = time_per_call(fill)
+    count = time_per_call(lambda: [full.get_count(name) for name in names])
+    copy = time_per_call(full.copy)
+    remove = time_per_call(drain) - copy
+    return {
+        'add_ns': add / num_items * 1e9,
+        'get_count_ns': count / num_items * 1e9,
+        'remove_ns': remove / num_items * 1e9,
+        'copy_us': copy * 1e6,
+    }
+
+
+def benchmark_games(sizes: list[int], directory: str) -> dict[str, str]:
+    """ Returns the game files to benchmark: those in games/, and generated
+        mazes of each size written to the given directory.
+
+    Parameters:
+        sizes: The number of rows and columns of each generated maze.
+        directory: Where to write the generated game files.
+
+    Returns:
+        Maps the name of each game to its game file.
+    """
+    games = {path: path for path in sorted(glob.glob('games/*.txt'))}
+    for size in sizes:
+        filename = os.path.join(directory, f'eller{size}.txt')
+        write_game(filename, size, size, seed=size)
+        games[f'eller{size}'] = filename
+    return games
+
+
+def run_suite(args: argparse.Namespace,
+              report: Callable[[str, dict[str, float]], None]) \
+    -> tuple[dict[str, object], dict[str, dict[str, float]]]:
+    """ Runs every benchmark, passing each result to report as it's done.
+
+    Parameters:
+        args: The command line arguments.
+        report: Called with the name and metrics of each benchmark.
+
+    Returns:
+        A description of the run, and maps each benchmark name to its metrics.
+    """
+    results = {}
+
+    def run(name: str, bench: Callable[[], dict[str, float]]) -> None:
+        results[name] = bench()
+        report(name, results[name])
+
+    with tempfile.TemporaryDirectory() as directory:
+        games = benchmark_games(args.sizes, directory)
+        for game, filename in games.items():
+            run(f'load/{game}', lambda: bench_load(filename))
+            run(f'move/{game}', lambda: bench_moves(filename))
+            run(f'text_draw/{game}', lambda: bench_text_draw(filename))
+        with photo_images() as real_images:
+            for game, filename in games.items():
+                if results[f'load/{game}']['cells'] <= IMAGE_VIEW_MAX_CELLS:
+                    run(f'image_view/{game}',
+                        lambda: bench_image_view(filename))
+            for size in args.sizes:
+                run(f'zoom/eller{size}',
+                    lambda: bench_zoom(games[f'eller{size}']))
+
+    run('inventory', bench_inventory)
+    for size in args.sizes:
+        for layout, result in bench_maze_layout(size).items():
+            results[f'maze_layout/{size}/{layout}'] = result
+            report(f'maze_layout/{size}/{layout}', result)
+        run(f'entity_memory/{size}', lambda: bench_entity_memory(size))
+        run(f'restart/{size}', lambda: bench_restart(size))
+    run(f'viewport/{args.viewport_size}',
+        lambda: bench_viewport(args.viewport_size))
+    run(f'engine/{args.game}', lambda: bench_engine(args.game))
+
+    meta = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'tk_images': real_images,
+        'sizes': args.sizes,
+        'viewport_size': args.viewport_size,
+        'game': args.game,
+    }
+    return meta, results
+
+
+def is_compared(metric: str) -> bool:
+    """ Returns True iff changes in the metric count as regressions or
+        improvements, rather than it being a count.
+
+    Parameters:
+        metric: The name of the metric.
+    """
+    return metric.endswith(HIGHER_IS_BETTER + LOWER_IS_BETTER)
+
+
+def compare(baseline: dict[str, dict[str, float]],
+            results: dict[str, dict[str, float]],
+            threshold: float = REGRESSION_THRESHOLD) \
+    -> list[tuple[str, str, float, float, float]]:
+    """ Compares benchmark results against a baseline.
+
+    Parameters:
+        baseline: The earlier results, mapping benchmark names to metrics.
+        results: The new results.
+        threshold: The relative change beyond which a metric is flagged.
+
+    Returns:
+        The (benchmark, metric, baseline value, new value, change) of each
+        metric in both which got worse by more than threshold. The change is
+        relative, positive when worse.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if old is None or not is_compared(metric) or old <= 0:
+                continue
+            change = (value - old) / old
+            if metric.endswith(HIGHER_IS_BETTER):
+                change = -change
+            if change > threshold:
+                regressions.append((name, metric, old, value, change))
+    return regressions
+
+
+def format_result(name: str, metrics: dict[str, float]) -> str:
+    """ Returns a benchmark's metrics as a line of text.
+
+    Parameters:
+        name: The name of the benchmark.
+        metrics: Maps each metric name to its value.
+    """
+    return f'{name}: ' + ', '.join(f'{metric} {value:.4g}'
+                                   for metric, value in metrics.items())
+
+
+def main():
+    """ Runs the benchmarks, printing their results and optionally writing
+        them to JSON or comparing them with an earlier run.
+    """
+    parser = argparse.ArgumentParser(description='MazeRunner benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[50, 500, 2000],
+                        help='sizes of the generated mazes')
+    parser.add_argument('--game', default='games/masters2.txt',
+                        help='game file for the headless engine')
+    parser.add_argument('--viewport-size', type=int, default=5000)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='flag regressions against this results file')
+    parser.add_argument('--results', metavar='FILE',
+                        help='compare this results file instead of running')
+    parser.add_argument('--threshold', type=float,
+                        default=REGRESSION_THRESHOLD,
+                        help='relative change flagged as a regression')
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results) as file:
+            run = json.load(file)
+    else:
+        meta, results = run_suite(
+            args, lambda name, metrics: print(format_result(name, metrics))
+        )
+        run = {'meta': meta, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(run, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline['meta'] != run['meta']:
+            print('Warning: the baseline was run differently:',
+                  baseline['meta'])
+        regressions = compare(baseline['results'], run['results'],
+                              args.threshold)
+        for name, metric, old, new, change in regressions:
+            print(f'REGRESSION {name} {metric}: {old:.4g} -> {new:.4g} '
+                  f'({change:+.0%} worse)')
+        print(f'{len(regressions)} regressions beyond '
+              f'{args.threshold:.0%} against {args.compare}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -35,6 +35,9 @@ MOVE_DELTAS = {
     LEFT: (0, -1),
     RIGHT: (0, 1),
 }
+UNDO = 'u'
+REDO = 'r'
+MAX_UNDO = 10000 # Moves kept for undo; older moves can no longer be undone
 
 MAX_HEALTH = 100
 MAX_HUNGER = 10
@@ -75,6 +78,21 @@ TEXT_FONT = ('Courier', 18)
 
 MAZE_WIDTH = 600
 MAZE_HEIGHT = 600
+
+# The smallest cells LevelView draws, in pixels. A maze too large to fit the
+# view with cells this size scrolls to follow the player instead.
+MIN_CELL_SIZE = 16
+
+# The cells drawn past each edge of a scrolling LevelView, so that it can
+# scroll this far before drawing the maze around the player again.
+CAMERA_MARGIN = 8
+
+# Keys which zoom LevelView out and back in, by a factor of two each press,
+# and how far it can zoom out. Zoomed out, the maze is drawn as the mixed
+# colour of blocks of tiles, without the items.
+ZOOM_OUT = '-'
+ZOOM_IN = '='
+MAX_ZOOM = 64
 INVENTORY_WIDTH = 200
 STATS_HEIGHT = 100
 
@@ -95,3 +113,7 @@ ENTITY_IMAGES = {
     CANDY: 'candy.png',
     LAVA_SHOES: 'shoes.png'
 }
+
+# The most scaled sprites ImageLevelView keeps. It must be at least the number
+# of tile and entity images, so that one cell size's sprites all fit.
+SPRITE_CACHE_SIZE = 64
@@ -0,0 +1,229 @@
+from __future__ import annotations
+from typing import Iterable, NamedTuple, Optional
+
+from a2_solution import *
+
+# Targets in a CompiledLevel's neighbour tables which aren't cells.
+ESCAPE = -1 # Moving out of the maze through an exit door
+OFF_GRID = -2 # Moving off the edge anywhere else, which is blocked
+
+# Item IDs in the order of their codes. Code 0 means there's no item.
+ITEM_IDS = (None,) + tuple(Level.ENTITIES)
+ITEM_CODES = {item_id: code for code, item_id in enumerate(ITEM_IDS)}
+COIN_CODE = ITEM_CODES[COIN]
+
+# In a move sequence, this followed by an item ID uses one of that item.
+USE_KEY = 'i'
+
+# The (HP, hunger, thirst) change from using each item, by item code, as in
+# the Item subclasses' apply methods.
+ITEM_EFFECTS = [(0, 0, 0)] * len(ITEM_IDS)
+ITEM_EFFECTS[ITEM_CODES[POTION]] = (POTION_AMOUNT, 0, 0)
+ITEM_EFFECTS[ITEM_CODES[APPLE]] = (0, APPLE_AMOUNT, 0)
+ITEM_EFFECTS[ITEM_CODES[HONEY]] = (0, HONEY_AMOUNT, 0)
+ITEM_EFFECTS[ITEM_CODES[WATER]] = (0, 0, WATER_AMOUNT)
+
+
+class SimulationResult(NamedTuple):
+    """ The outcome of replaying one move sequence. """
+    won: bool
+    lost: bool
+    end_index: Optional[int] # Index of the move which ended the game, if any
+    level_num: int
+    position: tuple[int, int]
+    stats: tuple[int, int, int] # (HP, hunger, thirst)
+    num_moves: int
+    inventory: dict[str, int] # Maps item names to the number held
+
+
+class CompiledLevel:
+    """ A Level flattened into lists indexed by cell number, so that the
+        headless engine can apply moves with only integer arithmetic.
+
+        Cell numbers are row * #columns + column. A successful move onto a
+        cell costs the player locked_costs[cell] HP, or unlocked_costs[cell]
+        once the doors are open; a cost of 0 marks a cell the player cannot
+        move onto.
+    """
+    def __init__(self, level: Level) -> None:
+        """ Compiles the given level.
+
+        Parameters:
+            level: A freshly loaded level, before any items are collected.
+        """
+        maze = level.get_maze()
+        num_rows, num_cols = level.get_dimensions()
+        self._num_cols = num_cols
+
+        self.locked_costs = []
+        for row in maze.get_tiles():
+            for tile in row:
+                self.locked_costs.append(
+                    0 if tile.is_blocking() else 1 + tile.damage()
+                )
+        self.unlocked_costs = list(self.locked_costs)
+        for row, col in maze.get_door_positions():
+            self.unlocked_costs[row * num_cols + col] = 1
+
+        self.items = bytearray(num_rows * num_cols)
+        for (row, col), item in level.get_items().items():
+            self.items[row * num_cols + col] = ITEM_CODES[item.get_id()]
+        self.num_coins = level.get_item_count(COIN)
+        self.start = self.to_cell(level.get_player_start())
+
+        # Maps move characters to a list giving the target of that move from
+        # each cell, as in Model.move_player.
+        self.neighbours = {}
+        for move, (d_row, d_col) in MOVE_DELTAS.items():
+            targets = []
+            for row in range(num_rows):
+                for col in range(num_cols):
+                    new_row, new_col = row + d_row, col + d_col
+                    if 0 <= new_row < num_rows and 0 <= new_col < num_cols:
+                        targets.append(new_row * num_cols + new_col)
+                    elif maze.is_exit((row, col)):
+                        targets.append(ESCAPE)
+                    else:
+                        targets.append(OFF_GRID)
+            self.neighbours[move] = targets
+
+    def to_cell(self, position: tuple[int, int]) -> int:
+        """ Returns the cell number of the given (row, column) position. """
+        return position[0] * self._num_cols + position[1]
+
+    def to_position(self, cell: int) -> tuple[int, int]:
+        """ Returns the (row, column) position of the given cell number. """
+        return divmod(cell, self._num_cols)
+
+
+class HeadlessEngine:
+    """ Replays move sequences against the levels of a game file without any
+        views. The rules match Model.move_player and MazeRunner.play.
+    """
+    def __init__(self, game_file: str) -> None:
+        """ Loads and compiles every level in the game file.
+
+        Parameters:
+            game_file: The file containing the levels for this game.
+        """
+        self._game_file = game_file
+        self._levels = [CompiledLevel(level) for level in load_game(game_file)]
+
+    def run(self, moves: str) -> SimulationResult:
+        """ Plays a new game with the given moves, stopping early if the game
+            is won or lost. USE_KEY followed by an item ID uses one of that
+            item, like the 'i <item name>' command. Other characters are
+            ignored.
+
+        Parameters:
+            moves: The sequence of move characters to apply, e.g. 'wwdiAsa'.
+        """
+        levels = self._levels
+        level_num = 0
+        level = levels[0]
+        pos = level.start
+        items = bytearray(level.items)
+        coins = level.num_coins
+        neighbours = level.neighbours
+        costs = level.locked_costs
+        unlocked = False
+
+        hp, hunger, thirst = MAX_HEALTH, 0, 0
+        num_moves = 0
+        inventory = [0] * len(ITEM_IDS)
+        won = lost = False
+        end_index = None
+
+        for index, move in enumerate(moves):
+            targets = neighbours.get(move)
+            if targets is None:
+                # The item ID after USE_KEY is then skipped as it's not a move
+                if move == USE_KEY:
+                    code = ITEM_CODES.get(moves[index + 1:index + 2])
+                    if code and inventory[code]:
+                        inventory[code] -= 1
+                        d_hp, d_hunger, d_thirst = ITEM_EFFECTS[code]
+                        hp = max(min(hp + d_hp, MAX_HEALTH), 0)
+                        hunger = max(min(hunger + d_hunger, MAX_HUNGER), 0)
+                        thirst = max(min(thirst + d_thirst, MAX_THIRST), 0)
+                continue
+            target = targets[pos]
+
+            if target < 0:
+                if target != ESCAPE:
+                    continue
+                level_num += 1
+                if level_num >= len(levels):
+                    won = True
+                    end_index = index
+                    break
+                level = levels[level_num]
+                pos = level.start
+                items = bytearray(level.items)
+                coins = level.num_coins
+                neighbours = level.neighbours
+                costs = level.locked_costs
+                unlocked = False
+                continue
+
+            cost = costs[target]
+            if not cost:
+                continue
+
+            num_moves += 1
+            if num_moves % 5 == 0:
+                if hunger < MAX_HUNGER:
+                    hunger += 1
+                if thirst < MAX_THIRST:
+                    thirst += 1
+            hp = hp - cost if hp > cost else 0
+            pos = target
+
+            item = items[target]
+            if item:
+                items[target] = 0
+                inventory[item] += 1
+                if item == COIN_CODE:
+                    coins -= 1
+            if not unlocked and not coins:
+                unlocked = True
+                costs = level.unlocked_costs
+
+            if not hp or hunger >= MAX_HUNGER or thirst >= MAX_THIRST:
+                lost = True
+                end_index = index
+                break
+
+        return SimulationResult(
+            won, lost, end_index, level_num, level.to_position(pos),
+            (hp, hunger, thirst),
+            num_moves,
+            {Level.ENTITIES[ITEM_IDS[code]].__name__: count
+             for code, count in enumerate(inventory) if count},
+        )
+
+    def run_many(self, move_sequences: Iterable[str]) \
+        -> list[SimulationResult]:
+        """ Plays a separate new game for each of the move sequences.
+
+        Parameters:
+            move_sequences: The move strings to replay.
+        """
+        return [self.run(moves) for moves in move_sequences]
+
+    def __repr__(self) -> str:
+        return f"HeadlessEngine('{self._game_file}')"
+
+
+def simulate(game_file: str, move_sequences: Iterable[str]) \
+    -> list[SimulationResult]:
+    """ Replays each move sequence as a separate game of the given game file.
+
+    Parameters:
+        game_file: The file containing the levels for this game.
+        move_sequences: The move strings to replay.
+
+    Returns:
+        The result of each game, in the same order as the sequences.
+    """
+    return HeadlessEngine(game_file).run_many(move_sequences)
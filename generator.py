@@ -0,0 +1,178 @@
+from __future__ import annotations
+import argparse
+import random
+import time
+from typing import IO, Optional
+
+from constants import *
+
+# The default share of open cells given to each kind of content. Any cell
+# left over is empty.
+DEFAULT_CONTENT = {
+    COIN: 0.02,
+    APPLE: 0.004,
+    HONEY: 0.002,
+    WATER: 0.004,
+    POTION: 0.002,
+    LAVA: 0.03,
+}
+
+# The chance that Eller's algorithm joins two cells in different sets, and
+# that a cell which isn't the last of its set is closed off from the row below.
+JOIN_CHANCE = 0.5
+CLOSE_CHANCE = 0.5
+
+_WALL = ord(WALL)
+
+
+def content_table(content: dict[str, float]) -> bytes:
+    """ Returns a translation table mapping each random byte onto a tile or
+        entity ID, so that a byte drawn uniformly at random is translated to
+        each ID with (about) its given probability.
+
+    Parameters:
+        content: Maps tile or entity IDs to the chance of an open cell
+                 holding them.
+    """
+    table = bytearray()
+    for char, chance in content.items():
+        table += char.encode() * round(chance * 256)
+    if len(table) > 256:
+        raise ValueError('content chances add up to more than 1')
+    return bytes(table.ljust(256, EMPTY.encode()))
+
+
+def write_level(file: IO[str], level_num: int, num_rows: int, num_cols: int,
+                rng: random.Random,
+                content: Optional[dict[str, float]] = None) -> None:
+    """ Writes one level to a game file, generating its maze row by row with
+        Eller's algorithm. Only the current row's sets are kept, so memory
+        use grows with the number of columns but not the number of rows.
+
+        Maze cells are at odd rows and columns, with walls or passages
+        between them and a wall border. The player starts in the top left
+        cell and the door is in the right border next to the bottom right
+        cell. The maze is perfect, so every cell can reach every other.
+
+    Parameters:
+        file: The open game file to write to.
+        level_num: The number of the level, counting from 1.
+        num_rows, num_cols: The dimensions of the maze, at least 3 each,
+                            with at least 5 rows if there are 3 columns.
+        rng: Random number generator for the maze and its content.
+        content: The chance of an open cell holding each tile or entity ID.
+                 Defaults to DEFAULT_CONTENT.
+    """
+    if num_rows < 3 or num_cols < 3:
+        raise ValueError('mazes must be at least 3x3')
+    # A maze of one cell has the player start next to the door with nowhere
+    # else to go, and the door only unlocks after a move. An even number of
+    # columns leaves a spare cell beside the door.
+    if num_rows < 5 and num_cols == 3:
+        raise ValueError('mazes 3 columns wide must have at least 5 rows')
+    table = content_table(DEFAULT_CONTENT if content is None else content)
+    cell_rows, cell_cols = (num_rows - 1) // 2, (num_cols - 1) // 2
+    join_limit = round(JOIN_CHANCE * 256)
+    close_limit = round(CLOSE_CHANCE * 256)
+    border = WALL * num_cols + '\n'
+
+    # The cells in each set form a ring in column order: right[c] is the
+    # next cell to the right in c's set, wrapping around to its leftmost
+    # cell, and left[c] the reverse. As sets never cross over each other,
+    # cells c and c + 1 are in the same set iff right[c] == c + 1.
+    left = list(range(cell_cols))
+    right = list(range(cell_cols))
+
+    file.write(f'Maze {level_num} - {num_rows} {num_cols}\n')
+    file.write(border)
+    for cell_row in range(cell_rows):
+        last = cell_row == cell_rows - 1
+
+        # The row of cells and the passages between them
+        cells = rng.randbytes(num_cols).translate(table)
+        line = bytearray(cells)
+        line[0::2] = WALL.encode() * len(line[0::2])
+        if num_cols % 2 == 0:
+            line[-1] = _WALL
+        joins = rng.randbytes(cell_cols)
+        for cell in range(cell_cols - 1):
+            if right[cell] != cell + 1 \
+                and (last or joins[cell] < join_limit):
+                # Splice the two rings together, keeping column order
+                after, before = right[cell], left[cell + 1]
+                right[cell], left[cell + 1] = cell + 1, cell
+                right[before], left[after] = after, before
+                line[2 * cell + 2] = cells[2 * cell + 2]
+        if cell_row == 0:
+            line[1] = ord(PLAYER)
+        if last:
+            line[-1] = ord(DOOR)
+            if num_cols % 2 == 0:
+                line[-2] = ord(EMPTY)
+        file.write(line.decode('latin-1') + '\n')
+        if last:
+            break
+
+        # The walls below, with at least one passage down from each set. A
+        # cell closed off below leaves its set, so the cell under it starts
+        # a new set of its own.
+        cells = rng.randbytes(num_cols).translate(table)
+        opened = bytearray(WALL.encode() * num_cols)
+        closes = rng.randbytes(cell_cols)
+        for cell in range(cell_cols):
+            if right[cell] != cell and closes[cell] < close_limit:
+                right[left[cell]], left[right[cell]] = right[cell], left[cell]
+                left[cell] = right[cell] = cell
+            else:
+                opened[2 * cell + 1] = cells[2 * cell + 1]
+        file.write(opened.decode('latin-1') + '\n')
+
+    # A maze with an even number of rows has a spare row of wall
+    if num_rows % 2 == 0:
+        file.write(border)
+    file.write(border)
+
+
+def write_game(filename: str, num_rows: int, num_cols: int,
+               num_levels: int = 1, seed: int = 0,
+               content: Optional[dict[str, float]] = None) -> None:
+    """ Writes a game file of generated mazes, streaming each row to disk as
+        it's generated. The same seed always gives the same game.
+
+    Parameters:
+        filename: The path of the game file to write.
+        num_rows, num_cols: The dimensions of each maze, as for write_level.
+        num_levels: The number of levels in the game.
+        seed: Seed for the random generation of every level.
+        content: The chance of an open cell holding each tile or entity ID.
+                 Defaults to DEFAULT_CONTENT.
+    """
+    rng = random.Random(seed)
+    with open(filename, 'w', buffering=1 << 20) as file:
+        for level_num in range(1, num_levels + 1):
+            write_level(file, level_num, num_rows, num_cols, rng, content)
+            file.write('\n')
+
+
+def main():
+    """ Generates a game file from the command line. """
+    parser = argparse.ArgumentParser(description='MazeRunner maze generator')
+    parser.add_argument('filename')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('cols', type=int)
+    parser.add_argument('--levels', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        write_game(args.filename, args.rows, args.cols, args.levels,
+                   args.seed)
+    except ValueError as error:
+        parser.error(str(error))
+    print(f'Wrote {args.levels} {args.rows}x{args.cols} levels to '
+          f'{args.filename} in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+from __future__ import annotations
+import argparse
+import atexit
+import functools
+import json
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Optional
+
+import a2_solution
+from a2_solution import *
+
+# Histogram buckets grow geometrically, BUCKETS_PER_DOUBLING to each power
+# of two nanoseconds from 2 ** MIN_EXPONENT (256ns) to 2 ** MAX_EXPONENT
+# (about 69s), so percentiles are accurate to within a fifth. Slower calls go
+# into a final overflow bucket.
+BUCKETS_PER_DOUBLING = 4
+MIN_EXPONENT = 8
+MAX_EXPONENT = 36
+BUCKET_BOUNDS = [
+    math.ceil(2 ** (step / BUCKETS_PER_DOUBLING))
+    for step in range(MIN_EXPONENT * BUCKETS_PER_DOUBLING,
+                      MAX_EXPONENT * BUCKETS_PER_DOUBLING + 1)
+]
+
+# The phases timed by the hooks: handling an input, the model updates within
+# it, and drawing the views. Phases overlap where one calls another, such as
+# the graphical game redrawing while it handles a key press.
+INPUT = 'input'
+MOVE = 'move'
+COLLECT = 'collect'
+DRAW = 'draw'
+PHASES = (INPUT, MOVE, COLLECT, DRAW)
+
+COUNTERS = (
+    'inputs', 'moves', 'levels_completed', 'items_collected',
+    'doors_unlocked', 'frames',
+)
+
+
+class LatencyHistogram:
+    """ A fixed-size histogram of call latencies, with buckets spaced so that
+        each is within a fifth of the last (see BUCKET_BOUNDS).
+    """
+    __slots__ = ('_counts', '_count', '_total_ns', '_max_ns')
+
+    def __init__(self) -> None:
+        """ Sets up an empty histogram. """
+        self.clear()
+
+    def clear(self) -> None:
+        """ Removes every latency recorded. """
+        self._counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self._count = 0
+        self._total_ns = 0
+        self._max_ns = 0
+
+    def record(self, ns: int) -> None:
+        """ Adds a latency to the histogram.
+
+        Parameters:
+            ns: The latency in nanoseconds.
+        """
+        self._counts[bisect_left(BUCKET_BOUNDS, ns)] += 1
+        self._count += 1
+        self._total_ns += ns
+        if ns > self._max_ns:
+            self._max_ns = ns
+
+    def get_count(self) -> int:
+        """ Returns the number of latencies recorded. """
+        return self._count
+
+    def percentile(self, fraction: float) -> int:
+        """ Returns (an upper bound on) the latency in nanoseconds which the
+            given fraction of the recorded latencies are within, or 0 if none
+            have been recorded.
+
+        Parameters:
+            fraction: The fraction of latencies, from 0 to 1.
+        """
+        target = max(1, math.ceil(fraction * self._count))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                if index == len(BUCKET_BOUNDS):
+                    return self._max_ns
+                return min(BUCKET_BOUNDS[index], self._max_ns)
+        return 0
+
+    def summary(self) -> dict[str, float]:
+        """ Returns the number of latencies recorded, and their mean, median,
+            99th percentile and maximum in microseconds.
+        """
+        return {
+            'count': self._count,
+            'mean_us': self._total_ns / self._count / 1e3 if self._count
+                       else 0,
+            'p50_us': self.percentile(0.5) / 1e3,
+            'p99_us': self.percentile(0.99) / 1e3,
+            'max_us': self._max_ns / 1e3,
+        }
+
+
+# The state of the hooks. They're process wide, since they wrap the methods
+# of the classes themselves.
+_histograms = {phase: LatencyHistogram() for phase in PHASES}
+_counters = dict.fromkeys(COUNTERS, 0)
+_running = set() # Phases being timed, so that nested calls aren't
+_originals = [] # The (class, name, method) of each method wrapped
+
+
+def _timed(phase: str, method: Callable,
+           before: Optional[Callable] = None,
+           after: Optional[Callable] = None) -> Callable:
+    """ Returns a wrapper for a method which times each call into the phase's
+        histogram, unless it's nested within another call in the phase.
+
+    Parameters:
+        phase: The phase the method's calls are part of.
+        method: The method to wrap.
+        before: Called with the method's arguments before each timed call,
+                returning a value which is passed on to after.
+        after: Called with the instance, the value from before and the
+               result after each timed call, to update the counters.
+    """
+    histogram = _histograms[phase]
+
+    @functools.wraps(method)
+    def timed(self, *args, **kwargs):
+        if phase in _running:
+            return method(self, *args, **kwargs)
+        state = before(self, *args) if before is not None else None
+        _running.add(phase)
+        start = time.perf_counter_ns()
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            histogram.record(time.perf_counter_ns() - start)
+            _running.discard(phase)
+        if after is not None:
+            after(self, state, result)
+        return result
+    return timed
+
+
+def _count_input(runner: MazeRunner, state: None, result: None) -> None:
+    _counters['inputs'] += 1
+
+
+def _move_state(model: Model, delta: tuple[int, int]) -> tuple[int, int]:
+    return model.get_num_moves(), model.get_level_num()
+
+
+def _count_move(model: Model, state: tuple[int, int], result: None) -> None:
+    # Blocked moves change nothing, and the level number also goes up when
+    # the last level is escaped, which did_level_up doesn't report
+    num_moves, level_num = state
+    if model.get_level_num() != level_num:
+        _counters['moves'] += 1
+        _counters['levels_completed'] += 1
+    elif model.get_num_moves() != num_moves:
+        _counters['moves'] += 1
+
+
+def _has_item(model: Model, position: tuple[int, int]) -> bool:
+    return position in model.get_current_items()
+
+
+def _count_collect(model: Model, had_item: bool,
+                   unlocked: list[tuple[int, int]]) -> None:
+    _counters['items_collected'] += had_item
+    _counters['doors_unlocked'] += len(unlocked)
+
+
+def _count_frame(view: UserInterface, state: None, result: None) -> None:
+    _counters['frames'] += 1
+
+
+def _subclasses(cls: type) -> list[type]:
+    """ Returns the class and all its subclasses defined so far. """
+    classes = [cls]
+    for subclass in cls.__subclasses__():
+        classes.extend(_subclasses(subclass))
+    return classes
+
+
+def _wrap(cls: type, name: str, phase: str,
+          before: Optional[Callable] = None,
+          after: Optional[Callable] = None) -> None:
+    """ Replaces a method defined by a class with a timed wrapper.
+
+    Parameters:
+        cls: The class defining the method.
+        name: The name of the method.
+        phase, before, after: As for _timed.
+    """
+    method = cls.__dict__[name]
+    _originals.append((cls, name, method))
+    setattr(cls, name, _timed(phase, method, before, after))
+
+
+def enable(output: Optional[str] = None) -> None:
+    """ Installs the hooks, which time every input handled by a MazeRunner,
+        model update and view draw, and count what happened. Views and
+        runners must be defined (e.g. a3 imported) before enabling.
+
+        While disabled the hooks aren't installed at all, so they cost
+        nothing.
+
+    Parameters:
+        output: If given, the path of a JSON file to dump the snapshot to
+                when the program exits.
+    """
+    if _originals:
+        return
+    # The text runner prompts again from within _handle_move after an invalid
+    # input, so only the dispatch below it is timed, leaving out the wait for
+    # the player to type
+    for runner in _subclasses(MazeRunner):
+        for name in ('_dispatch_move', '_handle_keypress'):
+            if name in runner.__dict__:
+                _wrap(runner, name, INPUT, after=_count_input)
+    _wrap(Model, 'move_player', MOVE, _move_state, _count_move)
+    _wrap(Model, 'attempt_collect_item', COLLECT, _has_item, _count_collect)
+    for view in _subclasses(UserInterface):
+        if 'draw' in view.__dict__:
+            _wrap(view, 'draw', DRAW, after=_count_frame)
+    if output is not None:
+        atexit.register(dump, output)
+
+
+def disable() -> None:
+    """ Removes the hooks, restoring the original methods. The recorded
+        timings and counters are kept.
+    """
+    while _originals:
+        cls, name, method = _originals.pop()
+        setattr(cls, name, method)
+
+
+def is_enabled() -> bool:
+    """ Returns True iff the hooks are installed. """
+    return bool(_originals)
+
+
+def reset() -> None:
+    """ Clears the recorded timings and counters. """
+    for histogram in _histograms.values():
+        histogram.clear()
+    _counters.update(dict.fromkeys(COUNTERS, 0))
+
+
+def snapshot() -> dict[str, dict]:
+    """ Returns a summary of each phase's latencies (see
+        LatencyHistogram.summary) and the counters.
+    """
+    return {
+        'phases': {phase: histogram.summary()
+                   for phase, histogram in _histograms.items()},
+        'counters': dict(_counters),
+    }
+
+
+def dump(filename: str) -> None:
+    """ Writes the snapshot to a JSON file.
+
+    Parameters:
+        filename: The path of the file to write.
+    """
+    with open(filename, 'w') as file:
+        json.dump(snapshot(), file, indent=2)
+
+
+def format_snapshot(data: dict[str, dict]) -> str:
+    """ Returns a snapshot as a table of text.
+
+    Parameters:
+        data: A snapshot, as returned by snapshot.
+    """
+    lines = [f"{'phase':>8} {'count':>8} {'mean':>9} {'p50':>9} {'p99':>9} "
+             f"{'max':>9}  (us)"]
+    for phase, summary in data['phases'].items():
+        lines.append(
+            f"{phase:>8} {summary['count']:>8} {summary['mean_us']:>9.1f} "
+            f"{summary['p50_us']:>9.1f} {summary['p99_us']:>9.1f} "
+            f"{summary['max_us']:>9.1f}"
+        )
+    lines.append(', '.join(f'{name} {count}'
+                           for name, count in data['counters'].items()))
+    return '\n'.join(lines)
+
+
+def main():
+    """ Plays a game with the hooks enabled, printing the snapshot after. """
+    parser = argparse.ArgumentParser(
+        description='Play MazeRunner, timing inputs, updates and draws'
+    )
+    parser.add_argument('--output', help='dump the snapshot to this JSON file')
+    parser.add_argument('--gui', action='store_true',
+                        help='play the graphical game rather than the text one')
+    args = parser.parse_args()
+
+    if args.gui:
+        import a3 # Defines the graphical views and runner to hook
+        play = a3.main
+    else:
+        play = a2_solution.main
+    enable(args.output)
+    try:
+        play()
+    finally:
+        print(format_snapshot(snapshot()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+from __future__ import annotations
+import argparse
+import struct
+import time
+from typing import Optional
+
+from a2_solution import *
+from engine import HeadlessEngine, SimulationResult, USE_KEY
+
+# Replay file format. The header holds the magic bytes, format version, game
+# file content hash (see Model.get_content_hash) and the length of the game
+# file path, which follows it. After that each input is appended as one byte:
+# the key of a move, UNDO or REDO, or USE_KEY followed by the ID of the item
+# used.
+REPLAY_MAGIC = b'MZRP'
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct('<4sB16sH')
+
+# The number of inputs between the snapshots kept for seeking.
+KEYFRAME_INTERVAL = 1000
+
+ITEM_IDS_BY_NAME = {item.__name__: item_id
+                    for item_id, item in Level.ENTITIES.items()}
+# Inputs which are a single key
+KEY_INPUTS = frozenset(MOVE_DELTAS) | {UNDO, REDO}
+
+
+def encode_input(command: str) -> Optional[bytes]:
+    """ Returns the replay encoding of an input handled by MazeRunner, or
+        None if it can't change the game (an unknown item name).
+
+    Parameters:
+        command: A move key, UNDO, REDO, or 'i <item name>'.
+    """
+    if command in KEY_INPUTS:
+        return command.encode()
+    item_id = ITEM_IDS_BY_NAME.get(command.partition(' ')[-1])
+    if item_id is None:
+        return None
+    return (USE_KEY + item_id).encode()
+
+
+def apply_input(model: Model, command: str) -> None:
+    """ Applies a recorded input to the model, as MazeRunner._handle_move does.
+
+    Parameters:
+        model: The game to apply the input to.
+        command: A move key, UNDO, REDO, or USE_KEY followed by an item ID.
+    """
+    delta = MOVE_DELTAS.get(command)
+    if delta is not None:
+        model.move_player(delta)
+    elif command == UNDO:
+        model.undo()
+    elif command == REDO:
+        model.redo()
+    else:
+        model.apply_item(Level.ENTITIES[command[1]].__name__)
+
+
+class ReplayRecorder:
+    """ Appends each input of a game to a replay file as it's played. """
+    def __init__(self, filename: str, model: Model) -> None:
+        """ Starts a replay file for a game which hasn't been played yet.
+
+        Parameters:
+            filename: The path of the replay file to create.
+            model: The game being recorded.
+        """
+        path = model.get_game_file().encode()
+        self._file = open(filename, 'wb')
+        self._file.write(REPLAY_HEADER.pack(
+            REPLAY_MAGIC, REPLAY_VERSION, model.get_content_hash(), len(path)
+        ))
+        self._file.write(path)
+        self._file.flush()
+
+    def record(self, command: str) -> None:
+        """ Appends an input to the replay. It's written straight away, so the
+            replay is complete up to the last input even if the game crashes.
+
+        Parameters:
+            command: The input handled by MazeRunner._handle_move.
+        """
+        data = encode_input(command)
+        if data is not None:
+            self._file.write(data)
+            self._file.flush()
+
+    def close(self) -> None:
+        """ Closes the replay file. """
+        self._file.close()
+
+
+class Replay:
+    """ The inputs recorded in a replay file. """
+    def __init__(self, filename: str) -> None:
+        """ Reads a replay file.
+
+        Parameters:
+            filename: The path of the replay file.
+
+        Raises:
+            ValueError: If the file isn't a valid replay.
+        """
+        with open(filename, 'rb') as file:
+            data = file.read()
+        if len(data) < REPLAY_HEADER.size or not data.startswith(REPLAY_MAGIC):
+            raise ValueError('not a MazeRunner replay')
+        _, version, self._content_hash, path_length \
+            = REPLAY_HEADER.unpack_from(data)
+        if version != REPLAY_VERSION:
+            raise ValueError(f'unsupported replay version {version}')
+
+        start = REPLAY_HEADER.size + path_length
+        self._game_file = data[REPLAY_HEADER.size:start].decode()
+        try:
+            self._inputs = data[start:].decode('ascii')
+        except UnicodeDecodeError:
+            raise ValueError('replay is corrupt') from None
+
+        # Only item uses take more than one character, so split around them
+        # rather than parsing the inputs one character at a time
+        runs = self._inputs.split(USE_KEY)
+        keys = [runs[0]]
+        self._commands = list(runs[0])
+        for run in runs[1:]:
+            if run[:1] not in Level.ENTITIES:
+                raise ValueError('replay is corrupt')
+            keys.append(run[1:])
+            self._commands.append(USE_KEY + run[0])
+            self._commands.extend(run[1:])
+        if not KEY_INPUTS.issuperset(''.join(keys)):
+            raise ValueError('replay is corrupt')
+
+    def get_game_file(self) -> str:
+        """ Returns the path of the game file the replay was recorded with. """
+        return self._game_file
+
+    def get_content_hash(self) -> bytes:
+        """ Returns the content hash of the game file recorded with. """
+        return self._content_hash
+
+    def get_inputs(self) -> str:
+        """ Returns the recorded inputs as a single string, in the format of
+            the headless engine's move sequences.
+        """
+        return self._inputs
+
+    def get_commands(self) -> list[str]:
+        """ Returns the recorded inputs as a list with one input each. """
+        return self._commands
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def __repr__(self) -> str:
+        return f"Replay('{self._game_file}', {len(self)} inputs)"
+
+
+class ReplayPlayer:
+    """ Plays a replay against the Model, headlessly or through a view, and
+        seeks to any input using snapshots kept every KEYFRAME_INTERVAL
+        inputs.
+    """
+    def __init__(self, replay: Replay, game_file: Optional[str] = None,
+                 keyframe_interval: int = KEYFRAME_INTERVAL) -> None:
+        """ Sets up a player for the replay.
+
+        Parameters:
+            replay: The replay to play.
+            game_file: The game file the replay is of, if it has moved since
+                       it was recorded. Defaults to the recorded path.
+            keyframe_interval: The number of inputs between snapshots.
+
+        Raises:
+            ValueError: If the game file has changed since the recording.
+        """
+        model = Model(game_file or replay.get_game_file())
+        if model.get_content_hash() != replay.get_content_hash():
+            raise ValueError('replay is of a different game file')
+        self._replay = replay
+        self._interval = keyframe_interval
+        self._keyframes = [model] # State after i * interval inputs
+
+    def seek(self, index: int) -> Model:
+        """ Returns the game as it was after the given number of inputs.
+
+        Parameters:
+            index: The number of inputs to apply, from 0 to len(replay).
+        """
+        commands = self._replay.get_commands()
+        index = max(0, min(index, len(commands)))
+        keyframe = min(index // self._interval, len(self._keyframes) - 1)
+        model = self._keyframes[keyframe].copy()
+        for position in range(keyframe * self._interval, index):
+            apply_input(model, commands[position])
+            # Keep snapshots of the new states passed, for later seeks
+            if (position + 1) % self._interval == 0 \
+                and (position + 1) // self._interval == len(self._keyframes):
+                self._keyframes.append(model.copy())
+        return model
+
+    def run(self) -> Model:
+        """ Plays the whole replay headlessly, returning the final game. """
+        return self.seek(len(self._replay))
+
+    def play(self, view: UserInterface, speed: Optional[float] = None,
+             start: int = 0, stop: Optional[int] = None) -> Model:
+        """ Plays the replay through a view, drawing the game after each
+            input.
+
+        Parameters:
+            view: The interface to draw the game with.
+            speed: The number of inputs per second, or None for full speed.
+            start: The number of inputs to skip before drawing.
+            stop: The number of inputs to stop after. Defaults to them all.
+
+        Returns:
+            The game after the last input played.
+        """
+        commands = self._replay.get_commands()
+        stop = len(commands) if stop is None else min(stop, len(commands))
+        model = self.seek(start)
+        for command in commands[start:stop]:
+            apply_input(model, command)
+            view.draw(
+                model.get_current_maze(),
+                model.get_current_items(),
+                model.get_player().get_position(),
+                model.get_player_inventory(),
+                model.get_player_stats(),
+            )
+            if speed:
+                time.sleep(1 / speed)
+        return model
+
+
+def verify_replay(replay: Replay, game_file: Optional[str] = None) \
+    -> SimulationResult:
+    """ Plays a replay until the game is won or lost, as MazeRunner.play
+        would, and returns the outcome. Its end_index is the index of the
+        input which ended the game. Replays without undo or redo run in
+        the headless engine; the others are played against the Model.
+
+    Parameters:
+        replay: The replay to verify.
+        game_file: The game file the replay is of, if it has moved since it
+                   was recorded. Defaults to the recorded path.
+
+    Raises:
+        ValueError: If the game file has changed since the recording.
+    """
+    game_file = game_file or replay.get_game_file()
+    inputs = replay.get_inputs()
+    if UNDO not in inputs and REDO not in inputs:
+        if LevelIndex(game_file).get_content_hash() \
+            != replay.get_content_hash():
+            raise ValueError('replay is of a different game file')
+        result = HeadlessEngine(game_file).run(inputs)
+        if result.end_index is None:
+            return result
+        # The engine counts characters, which is two for each item use
+        return result._replace(end_index=result.end_index
+                               - inputs.count(USE_KEY, 0, result.end_index))
+
+    model = ReplayPlayer(replay, game_file).seek(0)
+    end_index = None
+    for index, command in enumerate(replay.get_commands()):
+        apply_input(model, command)
+        if model.has_won() or model.has_lost():
+            end_index = index
+            break
+    return SimulationResult(
+        model.has_won(), model.has_lost(), end_index, model.get_level_num(),
+        model.get_player().get_position(), model.get_player_stats(),
+        model.get_num_moves(),
+        {name: len(items)
+         for name, items in model.get_player_inventory().get_items().items()},
+    )
+
+
+def record_game(game_file: str, filename: str,
+                view: Optional[UserInterface] = None) -> None:
+    """ Plays a game in the text interface, recording it to a replay file.
+
+    Parameters:
+        game_file: The file containing the levels for the game.
+        filename: The path of the replay file to create.
+        view: The interface to play in. Defaults to the one a2_solution.main
+              plays in (see text_interface).
+    """
+    if view is None:
+        view = text_interface()
+    runner = MazeRunner(game_file, view)
+    recorder = ReplayRecorder(filename, runner.get_model())
+    runner.set_recorder(recorder)
+    try:
+        runner.play()
+    finally:
+        recorder.close()
+
+
+def main():
+    """ Records, verifies or plays back replays from the command line. """
+    parser = argparse.ArgumentParser(description='MazeRunner replays')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help='play and record a game')
+    record.add_argument('game')
+    record.add_argument('replay')
+    verify = commands.add_parser('verify', help='check a replay\'s outcome')
+    verify.add_argument('replay')
+    verify.add_argument('--game', help='game file, if it has moved')
+    play = commands.add_parser('play', help='watch a replay')
+    play.add_argument('replay')
+    play.add_argument('--game', help='game file, if it has moved')
+    play.add_argument('--speed', type=float, default=10,
+                      help='inputs per second; 0 for full speed')
+    play.add_argument('--start', type=int, default=0,
+                      help='number of inputs to skip')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record_game(args.game, args.replay)
+    elif args.command == 'verify':
+        replay = Replay(args.replay)
+        start = time.perf_counter()
+        result = verify_replay(replay, args.game)
+        elapsed = time.perf_counter() - start
+        outcome = 'won' if result.won else 'lost' if result.lost \
+            else 'unfinished'
+        print(f'{len(replay)} inputs verified in {elapsed * 1e3:.1f}ms: '
+              f'{outcome} after {result.num_moves} moves '
+              f'(level {result.level_num + 1}, stats {result.stats})')
+    else:
+        player = ReplayPlayer(Replay(args.replay), args.game)
+        player.play(text_interface(), args.speed, args.start)
+
+
+if __name__ == '__main__':
+    main()
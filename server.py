@@ -0,0 +1,510 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from a2_solution import *
+
+# The protocol is one request per line, each answered with one line of
+# compact JSON, in order:
+#   new <game>              starts a session of a game file in the games
+#                           directory, answering with its id and full state
+#   <id> w|a|s|d|u|r        moves, undoes or redoes, answering with a diff
+#   <id> i <item name>      uses an item, answering with a diff
+#   <id> state              answers with the session's full state
+#   <id> window <top> <left> <height> <width>
+#                           answers with rows of the current maze
+#   <id> restart            restarts the game, answering with its full state
+#   <id> close              ends the session
+#   stats                   answers with the server's session counts
+# Errors are answered with {"e": message}. Diffs only hold what changed:
+#   p: player [row, col]    s: [HP, hunger, thirst]
+#   i: {item name: count}   x: [[row, col], ...] of items collected
+#   n: [[row, col, id]] of items put back by undo
+#   u: whether the door is unlocked
+#   won / lost: set once the game is over
+# A change of level is answered with the full state instead, marked by the
+# level number in "level".
+
+DEFAULT_PORT = 8765
+GAMES_DIR = 'games'
+
+# Sessions untouched for IDLE_TIMEOUT seconds are evicted, checked for every
+# EVICT_INTERVAL seconds.
+IDLE_TIMEOUT = 300
+EVICT_INTERVAL = 5
+
+# The moves and item uses each session can undo. Much less than a local
+# game's MAX_UNDO, as there are many sessions' journals to hold.
+SESSION_MAX_UNDO = 100
+
+READ_SIZE = 1 << 16
+MAX_REQUEST_LENGTH = 4096 # Longer requests close the connection
+
+MOVE_KEYS = frozenset(MOVE_DELTAS) | {UNDO, REDO}
+GAME_OVER_COMMANDS = frozenset(('state', 'window', 'restart', 'close'))
+
+
+def _encode(response: dict) -> bytes:
+    return json.dumps(response, separators=(',', ':')).encode() + b'\n'
+
+
+def _inventory_counts(model: Model) -> dict[str, int]:
+    return {name: len(items) for name, items
+            in model.get_player_inventory().get_items().items()}
+
+
+class Session:
+    """ One player's game on the server. """
+    __slots__ = ('model', 'last_used')
+
+    def __init__(self, model: Model, now: float) -> None:
+        """ Sets up a session.
+
+        Parameters:
+            model: The session's game.
+            now: The time the session was created.
+        """
+        self.model = model
+        self.last_used = now
+
+
+class GameServer:
+    """ Keeps many MazeRunner games in memory and plays requests against
+        them. Sessions of the same game file are copies of one unplayed
+        Model, so they share its pristine levels and the file is read once.
+    """
+    def __init__(self, games_dir: str = GAMES_DIR,
+                 idle_timeout: float = IDLE_TIMEOUT,
+                 max_undo: int = SESSION_MAX_UNDO) -> None:
+        """ Sets up a server with no sessions.
+
+        Parameters:
+            games_dir: The directory sessions' game files are in.
+            idle_timeout: Seconds after which an untouched session is evicted.
+            max_undo: The moves and item uses each session can undo.
+        """
+        self._games_dir = os.path.realpath(games_dir)
+        self._idle_timeout = idle_timeout
+        self._max_undo = max_undo
+        self._templates = {} # Maps game file paths to unplayed Models
+        # Ordered from least to most recently used, for eviction
+        self._sessions = OrderedDict()
+        self._next_id = 1
+        self._num_evicted = 0
+
+    def get_num_sessions(self) -> int:
+        """ Returns the number of sessions in memory. """
+        return len(self._sessions)
+
+    def _get_template(self, game: str) -> Model:
+        """ Returns the unplayed Model of a game file in the games directory,
+            loading it if this is the first session of the game.
+
+        Parameters:
+            game: The path of the game file within the games directory.
+
+        Raises:
+            ValueError: If the game file isn't in the games directory.
+        """
+        path = os.path.realpath(os.path.join(self._games_dir, game))
+        if os.path.commonpath((path, self._games_dir)) != self._games_dir \
+            or not os.path.isfile(path):
+            raise ValueError(f'no game {game}')
+        template = self._templates.get(path)
+        if template is None:
+            template = Model(path, self._max_undo)
+            self._templates[path] = template
+        return template
+
+    def new_session(self, game: str, now: float) -> int:
+        """ Starts a session of a game, returning its id.
+
+        Parameters:
+            game: The path of the game file within the games directory.
+            now: The current time.
+
+        Raises:
+            ValueError: If the game file isn't in the games directory.
+        """
+        session_id = self._next_id
+        self._next_id += 1
+        self._sessions[session_id] = Session(
+            self._get_template(game).copy(), now
+        )
+        return session_id
+
+    def evict_idle(self, now: float) -> int:
+        """ Removes the sessions which haven't been used within the idle
+            timeout, returning how many were evicted.
+
+        Parameters:
+            now: The current time.
+        """
+        sessions = self._sessions
+        cutoff = now - self._idle_timeout
+        evicted = 0
+        while sessions:
+            session = next(iter(sessions.values()))
+            if session.last_used > cutoff:
+                break
+            sessions.popitem(last=False)
+            evicted += 1
+        self._num_evicted += evicted
+        return evicted
+
+    def handle_request(self, line: str, now: float) -> bytes:
+        """ Handles one request line, returning the encoded response.
+
+        Parameters:
+            line: The request, without its newline.
+            now: The current time.
+        """
+        session_id, _, command = line.strip().partition(' ')
+        if session_id == 'new':
+            try:
+                session_id = self.new_session(command, now)
+            except (ValueError, OSError) as error:
+                return _encode({'e': str(error)})
+            response = self.full_state(self._sessions[session_id].model)
+            response['id'] = session_id
+            return _encode(response)
+        if session_id == 'stats':
+            return _encode({
+                'sessions': len(self._sessions),
+                'games': len(self._templates),
+                'evicted': self._num_evicted,
+                'max_rss_kib': resource.getrusage(
+                    resource.RUSAGE_SELF).ru_maxrss,
+            })
+
+        try:
+            session = self._sessions[int(session_id)]
+        except (KeyError, ValueError):
+            return _encode({'e': 'no such session'})
+        session.last_used = now
+        self._sessions.move_to_end(int(session_id))
+        model = session.model
+        name, _, argument = command.partition(' ')
+
+        if (model.has_won() or model.has_lost()) \
+            and name not in GAME_OVER_COMMANDS:
+            return _encode({'e': 'game over'})
+        if command in MOVE_KEYS or name == 'i':
+            return _encode(self.play(model, command))
+        if name == 'state':
+            return _encode(self.full_state(model))
+        if name == 'window':
+            try:
+                top, left, height, width = map(int, argument.split())
+            except ValueError:
+                return _encode({'e': 'expected window top left height width'})
+            rows, cols = model.get_current_maze().get_dimensions()
+            top, left = max(0, min(top, rows)), max(0, min(left, cols))
+            height = max(0, min(height, rows - top))
+            width = max(0, min(width, cols - left))
+            window = model.get_current_maze().get_window(
+                top, left, height, width)
+            return _encode({'rows': window.decode('latin-1').splitlines()})
+        if name == 'restart':
+            model.restart()
+            return _encode(self.full_state(model))
+        if name == 'close':
+            del self._sessions[int(session_id)]
+            return _encode({})
+        return _encode({'e': 'invalid command'})
+
+    def full_state(self, model: Model) -> dict:
+        """ Returns everything a client needs to draw the current level,
+            except its maze, which can be fetched a window at a time.
+
+        Parameters:
+            model: The session's game.
+        """
+        maze = model.get_current_maze()
+        state = {
+            'level': model.get_level_num(),
+            'size': list(maze.get_dimensions()),
+            'doors': [list(position)
+                      for position in maze.get_door_positions()],
+            'u': maze.is_unlocked(),
+            'items': [[row, col, item.get_id()] for (row, col), item
+                      in model.get_current_items().items()],
+            'p': list(model.get_player().get_position()),
+            's': list(model.get_player_stats()),
+            'i': _inventory_counts(model),
+        }
+        if model.has_won():
+            state['won'] = True
+        if model.has_lost():
+            state['lost'] = True
+        return state
+
+    def play(self, model: Model, command: str) -> dict:
+        """ Applies a move, undo, redo or item use to a game, as
+            MazeRunner._handle_move does, and returns what changed.
+
+        Parameters:
+            model: The session's game.
+            command: A move key, UNDO, REDO or 'i <item name>'.
+        """
+        level = model.get_level()
+        removed = level.get_removed_positions()
+        num_removed = len(removed)
+        last_removed = removed[-1] if removed else None
+        position = model.get_player().get_position()
+        stats = model.get_player_stats()
+        counts = _inventory_counts(model)
+        unlocked = level.get_maze().is_unlocked()
+
+        error = None
+        if command in MOVE_DELTAS:
+            model.move_player(MOVE_DELTAS[command])
+        elif command == UNDO:
+            if not model.undo():
+                error = 'Nothing to undo!'
+        elif command == REDO:
+            if not model.redo():
+                error = 'Nothing to redo!'
+        elif not model.apply_item(command.partition(' ')[-1]):
+            error = 'No item with that name!'
+        if error is not None:
+            return {'e': error}
+
+        if model.get_level() is not level:
+            return self.full_state(model)
+        diff = {}
+        if model.get_player().get_position() != position:
+            diff['p'] = list(model.get_player().get_position())
+        if model.get_player_stats() != stats:
+            diff['s'] = list(model.get_player_stats())
+        new_counts = _inventory_counts(model)
+        if new_counts != counts:
+            diff['i'] = {name: new_counts.get(name, 0)
+                         for name in counts.keys() | new_counts.keys()
+                         if new_counts.get(name, 0) != counts.get(name)}
+        if len(removed) > num_removed:
+            diff['x'] = [list(position) for position in removed[num_removed:]]
+        elif len(removed) < num_removed:
+            # Undo puts back at most the last item collected
+            row, col = last_removed
+            diff['n'] = [[row, col,
+                          model.get_current_items()[last_removed].get_id()]]
+        if level.get_maze().is_unlocked() != unlocked:
+            diff['u'] = not unlocked
+        if model.has_won():
+            diff['won'] = True
+        if model.has_lost():
+            diff['lost'] = True
+        return diff
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        """ Answers the requests sent over a connection until it closes.
+
+        Parameters:
+            reader, writer: The streams of the connection.
+        """
+        loop = asyncio.get_running_loop()
+        partial = b''
+        try:
+            while True:
+                # Answer every request received so far in one write, rather
+                # than waiting on each line
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                lines = (partial + data).split(b'\n')
+                partial = lines.pop()
+                if len(partial) > MAX_REQUEST_LENGTH:
+                    break
+                now = loop.time()
+                writer.write(b''.join(
+                    self.handle_request(line.decode(errors='replace'), now)
+                    for line in lines
+                ))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def evict_periodically(self) -> None:
+        """ Evicts idle sessions every EVICT_INTERVAL seconds, forever. """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(EVICT_INTERVAL)
+            self.evict_idle(loop.time())
+
+    async def serve(self, host: str = 'localhost', port: int = DEFAULT_PORT,
+                    path: Optional[str] = None) -> None:
+        """ Serves clients over TCP, or a Unix socket if path is given,
+            forever.
+
+        Parameters:
+            host, port: The TCP address to listen on.
+            path: The path of the Unix socket to listen on instead.
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_client, path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+        evictor = asyncio.create_task(self.evict_periodically())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+
+
+async def _connect(host: str, port: int, path: Optional[str]) \
+    -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if path is not None:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+
+async def _load_connection(host: str, port: int, path: Optional[str],
+                           game: str, num_sessions: int, num_rounds: int,
+                           seed: int, latencies: list[float]) \
+    -> tuple[int, int]:
+    """ Runs the load test's sessions over one connection, pipelining a
+        request for every session each round, and restarting the games which
+        end.
+
+    Returns:
+        The number of requests made, and how many were answered with an
+        error.
+    """
+    reader, writer = await _connect(host, port, path)
+    rng = random.Random(seed)
+    num_requests = errors = 0
+
+    async def round_trip(requests: list[str]) -> list[dict]:
+        nonlocal num_requests
+        num_requests += len(requests)
+        start = time.perf_counter()
+        writer.write(''.join(request + '\n' for request in requests).encode())
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in requests]
+        latencies.append(time.perf_counter() - start)
+        return responses
+
+    session_ids = [response['id'] for response
+                   in await round_trip([f'new {game}'] * num_sessions)]
+    keys = tuple(MOVE_DELTAS)
+    for _ in range(num_rounds):
+        responses = await round_trip([f'{session_id} {rng.choice(keys)}'
+                                      for session_id in session_ids])
+        errors += sum('e' in response for response in responses)
+        ended = [session_id for session_id, response
+                 in zip(session_ids, responses)
+                 if response.get('won') or response.get('lost')]
+        if ended:
+            await round_trip([f'{session_id} restart'
+                              for session_id in ended])
+    await round_trip([f'{session_id} close' for session_id in session_ids])
+    writer.close()
+    return num_requests, errors
+
+
+async def load_test(host: str = 'localhost', port: int = DEFAULT_PORT,
+                    path: Optional[str] = None, game: str = 'game1.txt',
+                    num_sessions: int = 10000, num_connections: int = 100,
+                    num_rounds: int = 20) -> dict[str, float]:
+    """ Plays many concurrent sessions against a running server, each making
+        a random move every round, and measures the server's throughput.
+
+    Parameters:
+        host, port, path: The server's address, as for GameServer.serve.
+        game: The game file each session plays.
+        num_sessions: The number of sessions kept open at once.
+        num_connections: The number of connections sharing the sessions.
+        num_rounds: The number of moves each session makes.
+
+    Returns:
+        The sessions open at the peak (from the server's stats), requests
+        answered, errors, seconds taken, requests per second and round trip
+        percentiles.
+    """
+    latencies = []
+    start = time.perf_counter()
+    per_connection = [num_sessions // num_connections
+                      + (index < num_sessions % num_connections)
+                      for index in range(num_connections)]
+    tasks = [asyncio.create_task(_load_connection(
+                host, port, path, game, count, num_rounds, index, latencies))
+             for index, count in enumerate(per_connection) if count]
+
+    # Ask the server how many sessions it holds once they've all started
+    reader, writer = await _connect(host, port, path)
+    peak = {}
+    while not any(task.done() for task in tasks):
+        writer.write(b'stats\n')
+        await writer.drain()
+        stats = json.loads(await reader.readline())
+        if stats['sessions'] >= peak.get('sessions', 0):
+            peak = stats
+        await asyncio.sleep(0.05)
+    counts = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    writer.close()
+    num_requests = sum(requests for requests, _ in counts)
+    errors = sum(errors for _, errors in counts)
+
+    latencies.sort()
+    return {
+        'peak_sessions': peak.get('sessions', 0),
+        'server_max_rss_kib': peak.get('max_rss_kib', 0),
+        'requests': num_requests,
+        'errors': errors,
+        'seconds': elapsed,
+        'requests_per_s': num_requests / elapsed,
+        'round_trip_p50_ms': latencies[len(latencies) // 2] * 1e3,
+        'round_trip_p99_ms': latencies[int(len(latencies) * 0.99)] * 1e3,
+    }
+
+
+def main():
+    """ Runs the server, or the load test client against one. """
+    parser = argparse.ArgumentParser(description='MazeRunner game server')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', metavar='PATH',
+                        help='use a Unix socket instead of TCP')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='run the server')
+    serve.add_argument('--games', default=GAMES_DIR,
+                       help='directory of the game files sessions can play')
+    serve.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT)
+    load = commands.add_parser('loadtest', help='load test a running server')
+    load.add_argument('--game', default='game1.txt')
+    load.add_argument('--sessions', type=int, default=10000)
+    load.add_argument('--connections', type=int, default=100)
+    load.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        server = GameServer(args.games, args.idle_timeout)
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    else:
+        result = asyncio.run(load_test(
+            args.host, args.port, args.unix, args.game, args.sessions,
+            args.connections, args.rounds,
+        ))
+        print(f"{result['peak_sessions']} concurrent sessions, "
+              f"server max RSS {result['server_max_rss_kib'] / 1024:.0f}MiB")
+        print(f"{result['requests']} requests in {result['seconds']:.2f}s "
+              f"({result['requests_per_s']:,.0f}/s), {result['errors']} "
+              f"errors; round trips p50 {result['round_trip_p50_ms']:.1f}ms, "
+              f"p99 {result['round_trip_p99_ms']:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
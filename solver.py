@@ -0,0 +1,922 @@
+from __future__ import annotations
+import argparse
+import heapq
+import os
+from collections import deque
+from typing import NamedTuple, Optional
+
+from a2_solution import *
+from engine import CompiledLevel, ESCAPE, COIN_CODE, ITEM_IDS
+
+UNREACHABLE = -1
+
+# Levels of the games in games/ which can't be survived by a new player, as
+# (game file name, level number). 'solver.py --survive' reports these without
+# failing, and fails if one of them turns out to be survivable after all.
+EXPECTED_UNSURVIVABLE = {
+    ('masters1.txt', 2), # The shortest route is 184 moves, with no water
+    ('masters2.txt', 2),
+}
+
+
+def bfs(
+    level: CompiledLevel,
+    source: int,
+    costs: list[int],
+) -> tuple[list[int], list[int]]:
+    """ Finds the fewest moves from the source cell to every other cell.
+
+    Parameters:
+        level: The compiled level to search.
+        source: The cell number to search from.
+        costs: The level's step costs to use, where 0 marks blocked cells.
+
+    Returns:
+        The distance to each cell (UNREACHABLE if there's no path), and the
+        cell each was first reached from.
+    """
+    distances = [UNREACHABLE] * len(costs)
+    parents = [UNREACHABLE] * len(costs)
+    distances[source] = 0
+    tables = list(level.neighbours.values())
+    queue = deque([source])
+    while queue:
+        cell = queue.popleft()
+        distance = distances[cell] + 1
+        for targets in tables:
+            target = targets[cell]
+            if target >= 0 and costs[target] \
+                and distances[target] == UNREACHABLE:
+                distances[target] = distance
+                parents[target] = cell
+                queue.append(target)
+    return distances, parents
+
+
+def cheapest_paths(
+    level: CompiledLevel,
+    source: int,
+    costs: list[int],
+    by_damage: bool,
+) -> tuple[list[Optional[tuple[int, int]]], list[int]]:
+    """ Finds the best path from the source cell to every other cell, either
+        by fewest moves and then least HP lost, or by least HP lost and then
+        fewest moves.
+
+    Parameters:
+        level: The compiled level to search.
+        source: The cell number to search from.
+        costs: The level's step costs to use, where 0 marks blocked cells.
+        by_damage: True to prefer losing the least HP over the fewest moves.
+
+    Returns:
+        The (moves, HP lost) to reach each cell (None if there's no path), and
+        the cell each was reached from.
+    """
+    best = [None] * len(costs)
+    parents = [UNREACHABLE] * len(costs)
+    best[source] = (0, 0)
+    tables = list(level.neighbours.values())
+    queue = [((0, 0), source)]
+    while queue:
+        key, cell = heapq.heappop(queue)
+        if _to_key(best[cell], by_damage) != key:
+            continue
+        moves, damage = best[cell]
+        for targets in tables:
+            target = targets[cell]
+            if target < 0 or not costs[target]:
+                continue
+            cost = (moves + 1, damage + costs[target])
+            new_key = _to_key(cost, by_damage)
+            if best[target] is None \
+                or new_key < _to_key(best[target], by_damage):
+                best[target] = cost
+                parents[target] = cell
+                heapq.heappush(queue, (new_key, target))
+    return best, parents
+
+
+def _to_key(cost: tuple[int, int], by_damage: bool) -> tuple[int, int]:
+    """ Returns the ordering key of a (moves, HP lost) path cost. """
+    return (cost[1], cost[0]) if by_damage else cost
+
+
+def path_to(parents: list[int], target: int) -> list[int]:
+    """ Returns the cells on the path found by bfs from its source to the
+        target, excluding the source.
+
+    Parameters:
+        parents: The parent of each cell, as returned by bfs.
+        target: The cell at which the path ends.
+    """
+    path = []
+    while parents[target] != UNREACHABLE:
+        path.append(target)
+        target = parents[target]
+    path.reverse()
+    return path
+
+
+def moves_along(level: CompiledLevel, start: int, path: list[int]) -> str:
+    """ Returns the move characters which walk from start along the path.
+
+    Parameters:
+        level: The compiled level the path is in.
+        start: The cell at which the path begins.
+        path: The cells visited after the start, in order.
+    """
+    moves = []
+    for cell in path:
+        for move, targets in level.neighbours.items():
+            if targets[start] == cell:
+                moves.append(move)
+                break
+        start = cell
+    return ''.join(moves)
+
+
+def escape_move(level: CompiledLevel, cell: int) -> Optional[str]:
+    """ Returns a move which escapes the maze from the given cell, if any.
+
+    Parameters:
+        level: The compiled level the cell is in.
+        cell: The cell to escape from.
+    """
+    for move, targets in level.neighbours.items():
+        if targets[cell] == ESCAPE:
+            return move
+    return None
+
+
+def first_steps(level: CompiledLevel, cell: int) -> list[int]:
+    """ Returns the cells the player can step to from the given cell while the
+        doors are still locked.
+
+    Parameters:
+        level: The compiled level the cell is in.
+        cell: The cell to step from.
+    """
+    return [targets[cell] for targets in level.neighbours.values()
+            if targets[cell] >= 0 and level.locked_costs[targets[cell]]]
+
+
+class LevelSolver:
+    """ Finds the fewest moves needed to collect every coin in a level and then
+        leave through an exit door.
+
+        Rather than searching the raw grid, the solver runs one BFS from the
+        start and from each coin to find the distances between these points.
+        It then runs A* over (last point visited, coins collected) states,
+        using the minimum spanning tree of the remaining coins as a lower
+        bound. The search ignores HP, hunger and thirst; see the resource
+        solver for that.
+    """
+    def __init__(self, level: Level) -> None:
+        """ Prepares to solve the given level.
+
+        Parameters:
+            level: A freshly loaded level, before any items are collected.
+        """
+        self._level = CompiledLevel(level)
+        compiled = self._level
+        self._coins = [cell for cell, item in enumerate(compiled.items)
+                       if item == COIN_CODE]
+        self._points = [compiled.start] + self._coins
+        self._exits = [cell for cell in range(len(compiled.items))
+                       if escape_move(compiled, cell) is not None]
+        self._mst_cache = {}
+        self._find_distances()
+
+    def _find_distances(self) -> None:
+        """ Finds the distances between the start and coins with the doors
+            locked, and from each of them to the nearest exit with the doors
+            unlocked. Also notes which coins each leg passes over on the way.
+        """
+        level, points = self._level, self._points
+        coin_bits = {cell: 1 << index
+                     for index, cell in enumerate(self._coins)}
+        self._distances = []
+        self._passed = [] # Coin bitmask of each leg, including its target
+        for source in points:
+            distances, parents = bfs(level, source, level.locked_costs)
+            self._distances.append([distances[target] for target in points])
+            passed = []
+            for target in points:
+                mask = 0
+                if distances[target] != UNREACHABLE:
+                    for cell in path_to(parents, target):
+                        mask |= coin_bits.get(cell, 0)
+                passed.append(mask)
+            self._passed.append(passed)
+
+        # The start can only head straight for an exit if there are no coins
+        self._exit_distances = []
+        for index, source in enumerate(points):
+            if index == 0 and self._coins:
+                self._exit_distances.append(UNREACHABLE)
+                continue
+            self._exit_distances.append(self._exit_path(source)[0])
+
+    def _exit_path(self, source: int) -> tuple[int, list[int]]:
+        """ Finds the fewest moves from the source cell to an exit once every
+            coin has been collected.
+
+            The doors only unlock after a successful move, so on a level
+            without coins the first move from the start is made with them
+            still locked.
+
+        Parameters:
+            source: The cell number to search from.
+
+        Returns:
+            The distance to the nearest exit (UNREACHABLE if there's no path),
+            and the cells on the way there, excluding the source.
+        """
+        level = self._level
+        if source != level.start or self._coins:
+            distances, parents = bfs(level, source, level.unlocked_costs)
+            reachable = [cell for cell in self._exits
+                         if distances[cell] != UNREACHABLE]
+            if not reachable:
+                return UNREACHABLE, []
+            exit_cell = min(reachable, key=distances.__getitem__)
+            return distances[exit_cell], path_to(parents, exit_cell)
+
+        best, best_path = UNREACHABLE, []
+        for cell in first_steps(level, source):
+            distance, path = self._exit_path(cell)
+            if distance != UNREACHABLE \
+                and (best == UNREACHABLE or distance + 1 < best):
+                best, best_path = distance + 1, [cell] + path
+        return best, best_path
+
+    def _spanning_cost(self, remaining: int) -> int:
+        """ Returns the weight of a minimum spanning tree joining the coins in
+            the given bitmask, using Prim's algorithm.
+
+        Parameters:
+            remaining: Bitmask of the coins to join.
+        """
+        cost = self._mst_cache.get(remaining)
+        if cost is not None:
+            return cost
+        nodes = [index + 1 for index in range(len(self._coins))
+                 if remaining >> index & 1]
+        cost = 0
+        if nodes:
+            distances = self._distances
+            best = {node: distances[nodes[0]][node] for node in nodes[1:]}
+            while best:
+                node = min(best, key=best.get)
+                cost += best.pop(node)
+                for other in best:
+                    best[other] = min(best[other], distances[node][other])
+        self._mst_cache[remaining] = cost
+        return cost
+
+    def _heuristic(self, point: int, collected: int) -> int:
+        """ Returns a lower bound on the moves needed to finish the level from
+            the given search state, including the final escape move.
+
+        Parameters:
+            point: Index into the start and coin points of the current point.
+            collected: Bitmask of the coins collected so far.
+        """
+        full = (1 << len(self._coins)) - 1
+        remaining = full & ~collected
+        if not remaining:
+            return self._exit_distances[point] + 1
+        nodes = [index + 1 for index in range(len(self._coins))
+                 if remaining >> index & 1]
+        return min(self._distances[point][node] for node in nodes) \
+            + self._spanning_cost(remaining) \
+            + min(self._exit_distances[node] for node in nodes) + 1
+
+    def _search(self) -> Optional[list[int]]:
+        """ Runs the A* search over (point, collected coins) states.
+
+        Returns:
+            The indices of the points to visit in order, starting with the
+            start point, or None if the level can't be finished.
+        """
+        num_points = len(self._points)
+        full = (1 << len(self._coins)) - 1
+        distances, passed = self._distances, self._passed
+        exit_distances = self._exit_distances
+
+        # Unreachable coins or exits make the level unsolvable
+        if any(distances[0][node] == UNREACHABLE
+               for node in range(1, num_points)):
+            return None
+        if all(distance == UNREACHABLE for distance in exit_distances):
+            return None
+
+        best = {(0, 0): 0}
+        parents = {(0, 0): None}
+        queue = [(self._heuristic(0, 0), 0, 0, 0)]
+        while queue:
+            _, cost, point, collected = heapq.heappop(queue)
+            if best.get((point, collected)) != cost:
+                continue
+            if collected == full:
+                if exit_distances[point] == UNREACHABLE:
+                    continue
+                route = [point]
+                state = parents[(point, collected)]
+                while state is not None:
+                    route.append(state[0])
+                    state = parents[state]
+                route.reverse()
+                return route
+            for node in range(1, num_points):
+                bit = 1 << (node - 1)
+                if collected & bit or distances[point][node] == UNREACHABLE:
+                    continue
+                state = (node, collected | passed[point][node])
+                new_cost = cost + distances[point][node]
+                if new_cost < best.get(state, new_cost + 1):
+                    best[state] = new_cost
+                    parents[state] = (point, collected)
+                    if state[1] == full:
+                        if exit_distances[node] == UNREACHABLE:
+                            continue
+                        estimate = new_cost + exit_distances[node] + 1
+                    else:
+                        estimate = new_cost + self._heuristic(*state)
+                    heapq.heappush(queue, (estimate, new_cost) + state)
+        return None
+
+    def solve(self) -> Optional[str]:
+        """ Returns a shortest sequence of move characters which collects all
+            the coins and escapes the level, or None if that's impossible.
+        """
+        route = self._search()
+        if route is None:
+            return None
+        level = self._level
+        moves = []
+        cell = level.start
+        for point in route[1:]:
+            target = self._points[point]
+            _, parents = bfs(level, cell, level.locked_costs)
+            moves.append(moves_along(level, cell, path_to(parents, target)))
+            cell = target
+
+        _, path = self._exit_path(cell)
+        moves.append(moves_along(level, cell, path))
+        moves.append(escape_move(level, path[-1] if path else cell))
+        return ''.join(moves)
+
+
+def solve_level(level: Level) -> Optional[str]:
+    """ Returns a shortest move sequence which finishes the given level, or
+        None if it can't be finished. HP, hunger and thirst are ignored.
+
+    Parameters:
+        level: A freshly loaded level.
+    """
+    return LevelSolver(level).solve()
+
+
+def solve_game(game_file: str) -> list[Optional[str]]:
+    """ Solves every level in a game file.
+
+    Parameters:
+        game_file: The file containing the levels for this game.
+
+    Returns:
+        The shortest move sequence for each level, or None for levels which
+        can't be finished.
+    """
+    return [solve_level(level) for level in load_game(game_file)]
+
+
+class PlayerState(NamedTuple):
+    """ The parts of the game state which carry over between levels. """
+    hp: int
+    hunger: int
+    thirst: int
+    inventory: dict[str, int] # Maps item names to the number held
+    num_moves: int
+
+
+class SurvivalResult(NamedTuple):
+    """ The outcome of searching for a route which survives a level. """
+    survivable: bool
+    commands: list[str] # Moves and 'i <item>' commands, as for MazeRunner
+    final_state: Optional[PlayerState] # None if the level can't be survived
+
+
+NEW_PLAYER = PlayerState(MAX_HEALTH, 0, 0, {}, 0)
+ITEM_NAMES = {item_id: Level.ENTITIES[item_id].__name__
+              for item_id in ITEM_IDS[1:]}
+
+ITEM_AMOUNTS = {
+    POTION: POTION_AMOUNT,
+    APPLE: APPLE_AMOUNT,
+    HONEY: HONEY_AMOUNT,
+    WATER: WATER_AMOUNT,
+}
+
+# How much each item adds to the HP, hunger and thirst budgets, given it is
+# only used when it's needed to stay alive. Used at that point, none of its
+# effect is lost to the stat's bounds.
+HP_GAINS = {POTION: POTION_AMOUNT}
+HUNGER_GAINS = {APPLE: -APPLE_AMOUNT, HONEY: -HONEY_AMOUNT}
+THIRST_GAINS = {WATER: -WATER_AMOUNT}
+
+
+def budgets(state: PlayerState) -> tuple[int, int, int]:
+    """ Returns the HP, hunger and thirst budgets of a player state. The HP
+        budget is the HP plus what held potions would add; the hunger and
+        thirst budgets are how many more increases the player can take
+        before losing, counting held food and water.
+
+    Parameters:
+        state: The state of the player.
+    """
+    hp, hunger, thirst = state.hp, MAX_HUNGER - 1 - state.hunger, \
+        MAX_THIRST - 1 - state.thirst
+    for item_id, name in ITEM_NAMES.items():
+        count = state.inventory.get(name, 0)
+        hp += HP_GAINS.get(item_id, 0) * count
+        hunger += HUNGER_GAINS.get(item_id, 0) * count
+        thirst += THIRST_GAINS.get(item_id, 0) * count
+    return hp, hunger, thirst
+
+
+class ResourceSolver:
+    """ Finds the route through a level which collects every coin, escapes,
+        and leaves the player with the most HP, without running out of HP or
+        reaching the hunger or thirst limits on the way.
+
+        Items are only used when they are needed to stay alive, which wastes
+        none of their effect. A label's HP, hunger and thirst can then be
+        reduced to three budgets (see budgets()). The search moves between
+        the start and item cells. Between each pair it considers both the
+        path with the fewest moves and the path losing the least HP. It runs
+        best-first on an upper bound of the final HP. Labels at the same
+        (point, items collected, move count mod 5) whose budgets are all no
+        better than an existing label's are pruned.
+
+        Items picked up partway along a leg only count from the end of that
+        leg, and legs between items keep the doors locked. Both choices can
+        only make the search more cautious than the game.
+    """
+    def __init__(self, level: Level) -> None:
+        """ Prepares to solve the given level.
+
+        Parameters:
+            level: A freshly loaded level, before any items are collected.
+        """
+        self._level = compiled = CompiledLevel(level)
+        item_cells = [cell for cell, item in enumerate(compiled.items) if item]
+        self._points = [compiled.start] + item_cells
+        self._item_ids = [ITEM_IDS[compiled.items[cell]]
+                          for cell in item_cells]
+        self._bits = {cell: 1 << index
+                      for index, cell in enumerate(item_cells)}
+        self._coin_mask = sum(1 << index
+                              for index, item_id in enumerate(self._item_ids)
+                              if item_id == COIN)
+        self._exits = [cell for cell in range(len(compiled.items))
+                       if escape_move(compiled, cell) is not None]
+        self._mst_cache = {}
+        self._find_legs()
+
+    def _walk(
+        self,
+        parents: list[int],
+        best: list[Optional[tuple[int, int]]],
+        target: int,
+    ) -> tuple[int, int, int]:
+        """ Returns the (moves, HP lost, item bitmask) of the path to target.
+
+        Parameters:
+            parents: The parents found by cheapest_paths.
+            best: The path costs found by cheapest_paths.
+            target: The cell at which the path ends.
+        """
+        passed = 0
+        for cell in path_to(parents, target):
+            passed |= self._bits.get(cell, 0)
+        return best[target] + (passed,)
+
+    def _exit_leg(self, source: int, by_damage: bool) \
+        -> Optional[tuple[int, int, int, int]]:
+        """ Returns the (moves, HP, passed, exit) of the best path from the
+            source cell to an exit with the doors unlocked, or None if no exit
+            can be reached.
+
+        Parameters:
+            source: The cell number to search from.
+            by_damage: True to prefer losing the least HP over fewest moves.
+        """
+        level = self._level
+        best, parents = cheapest_paths(level, source, level.unlocked_costs,
+                                       by_damage)
+        reachable = [cell for cell in self._exits if best[cell] is not None]
+        if not reachable:
+            return None
+        cell = min(reachable,
+                   key=lambda cell: _to_key(best[cell], by_damage))
+        return self._walk(parents, best, cell) + (cell,)
+
+    def _find_legs(self) -> None:
+        """ Finds the candidate paths between every pair of points with the
+            doors locked, and from every point to an exit with them unlocked.
+        """
+        level, points = self._level, self._points
+        self._legs = [] # [source][target] -> list of (moves, HP, passed)
+        # [source] -> list of (moves, HP, passed, exit), with the first cell
+        # appended when the leg's first step is made with the doors locked
+        self._exit_legs = []
+        for index, source in enumerate(points):
+            legs = [[] for _ in points]
+            for by_damage in (False, True):
+                best, parents = cheapest_paths(level, source,
+                                               level.locked_costs, by_damage)
+                for target_index, target in enumerate(points):
+                    if best[target] is not None and target_index:
+                        leg = self._walk(parents, best, target)
+                        if leg not in legs[target_index]:
+                            legs[target_index].append(leg)
+            self._legs.append(legs)
+
+            exit_legs = []
+            if index:
+                candidates = [self._exit_leg(source, by_damage)
+                              for by_damage in (False, True)]
+            elif not self._coin_mask:
+                # The doors only unlock after a successful move, so the first
+                # step from the start is made with them still locked
+                candidates = []
+                for by_damage in (False, True):
+                    firsts = []
+                    for first in first_steps(level, source):
+                        rest = self._exit_leg(first, by_damage)
+                        if rest is not None:
+                            firsts.append((
+                                rest[0] + 1,
+                                rest[1] + level.locked_costs[first],
+                                rest[2] | self._bits.get(first, 0),
+                                rest[3],
+                                first,
+                            ))
+                    candidates.append(min(
+                        firsts, default=None,
+                        key=lambda leg: _to_key(leg[:2], by_damage),
+                    ))
+            else:
+                candidates = []
+            for leg in candidates:
+                if leg is not None and leg not in exit_legs:
+                    exit_legs.append(leg)
+            self._exit_legs.append(exit_legs)
+
+        # Fewest moves between points, for bounding the HP still to be lost
+        self._moves = [[min((leg[0] for leg in legs), default=None)
+                        for legs in source_legs]
+                       for source_legs in self._legs]
+        self._exit_moves = [min((leg[0] for leg in legs), default=None)
+                            for legs in self._exit_legs]
+
+    def _spanning_cost(self, remaining: int) -> int:
+        """ Returns the weight of a minimum spanning tree joining the coins in
+            the given bitmask, by fewest moves.
+
+        Parameters:
+            remaining: Bitmask of the coins to join.
+        """
+        cost = self._mst_cache.get(remaining)
+        if cost is not None:
+            return cost
+        nodes = [index + 1 for index in range(len(self._item_ids))
+                 if remaining >> index & 1]
+        cost = 0
+        if nodes:
+            best = {node: self._moves[nodes[0]][node] for node in nodes[1:]}
+            while best:
+                node = min(best, key=best.get)
+                cost += best.pop(node)
+                for other in best:
+                    best[other] = min(best[other], self._moves[node][other])
+        self._mst_cache[remaining] = cost
+        return cost
+
+    def _moves_left(self, point: int, collected: int) -> Optional[int]:
+        """ Returns a lower bound on the moves needed to collect the remaining
+            coins and reach an exit, or None if that is impossible.
+
+        Parameters:
+            point: Index of the point the player is at.
+            collected: Bitmask of the items collected so far.
+        """
+        remaining = self._coin_mask & ~collected
+        if not remaining:
+            return self._exit_moves[point]
+        nodes = [index + 1 for index in range(len(self._item_ids))
+                 if remaining >> index & 1]
+        to_coin = [self._moves[point][node] for node in nodes]
+        to_exit = [self._exit_moves[node] for node in nodes]
+        if None in to_coin or all(moves is None for moves in to_exit):
+            return None
+        return min(to_coin) + self._spanning_cost(remaining) \
+            + min(moves for moves in to_exit if moves is not None)
+
+    def _collect(
+        self,
+        budget: tuple[int, int, int],
+        collected: int,
+        passed: int,
+    ) -> tuple[int, int, int]:
+        """ Returns the budgets after picking up the new items in passed.
+
+        Parameters:
+            budget: The (HP, hunger, thirst) budgets before the pickup.
+            collected: Bitmask of the items already collected.
+            passed: Bitmask of the items on the path just walked.
+        """
+        hp, hunger, thirst = budget
+        new = passed & ~collected
+        index = 0
+        while new:
+            if new & 1:
+                item_id = self._item_ids[index]
+                hp += HP_GAINS.get(item_id, 0)
+                hunger += HUNGER_GAINS.get(item_id, 0)
+                thirst += THIRST_GAINS.get(item_id, 0)
+            new >>= 1
+            index += 1
+        return hp, hunger, thirst
+
+    def _search(self, start: PlayerState) -> Optional[list[tuple]]:
+        """ Runs the best-first search from the given starting state.
+
+        Parameters:
+            start: The state of the player at the start of the level.
+
+        Returns:
+            The legs of the best route in order, each as (source point,
+            target point or None for the exit, (moves, HP, passed, ...)), or
+            None if no route survives.
+        """
+        potions = sum(1 << index for index, item_id
+                      in enumerate(self._item_ids) if item_id in HP_GAINS)
+        budget = budgets(start)
+        if budget[0] < 1 or budget[1] < 0 or budget[2] < 0:
+            return None
+
+        # Each label is (point, collected, phase, budgets, parent, leg)
+        labels = [(0, 0, start.num_moves % 5, budget, None, None)]
+        fronts = {}
+        queue = [(-budget[0], 0)]
+        while queue:
+            _, label_id = heapq.heappop(queue)
+            point, collected, phase, budget, _, leg = labels[label_id]
+            if point is None:
+                route = []
+                while label_id:
+                    point, _, _, _, parent, leg = labels[label_id]
+                    route.append((labels[parent][0], point, leg))
+                    label_id = parent
+                route.reverse()
+                return route
+
+            moves_left = self._moves_left(point, collected)
+            if moves_left is None:
+                continue
+            options = []
+            if not self._coin_mask & ~collected:
+                options.extend((None, leg) for leg in self._exit_legs[point])
+            for target in range(1, len(self._points)):
+                if not collected >> (target - 1) & 1:
+                    options.extend((target, leg)
+                                   for leg in self._legs[point][target])
+
+            for target, leg in options:
+                moves, damage, passed = leg[:3]
+                ticks = (phase + moves) // 5
+                hp, hunger, thirst = budget
+                if hp - damage < 1 or hunger < ticks or thirst < ticks:
+                    continue
+                new_budget = self._collect(
+                    (hp - damage, hunger - ticks, thirst - ticks),
+                    collected, passed
+                )
+                new_collected = collected | passed
+                new_phase = (phase + moves) % 5
+                key = (target, new_collected, new_phase)
+                front = fronts.setdefault(key, [])
+                if any(all(old >= new for old, new in zip(other, new_budget))
+                       for other in front):
+                    continue
+                front.append(new_budget)
+
+                labels.append((target, new_collected, new_phase, new_budget,
+                               label_id, leg))
+                if target is None:
+                    bound = new_budget[0]
+                else:
+                    left = self._moves_left(target, new_collected)
+                    if left is None:
+                        continue
+                    unclaimed = potions & ~new_collected
+                    bound = new_budget[0] - left + sum(
+                        HP_GAINS[self._item_ids[index]]
+                        for index in range(len(self._item_ids))
+                        if unclaimed >> index & 1
+                    )
+                heapq.heappush(queue, (-bound, len(labels) - 1))
+        return None
+
+    def _leg_moves(self, source: int, target: Optional[int], leg: tuple) \
+        -> str:
+        """ Returns the move characters which walk the given leg.
+
+        Parameters:
+            source: Index of the point the leg starts from.
+            target: Index of the point the leg ends at, or None for an exit.
+            leg: The (moves, HP, passed, ...) of the leg.
+        """
+        level = self._level
+        start = self._points[source]
+        moves = ''
+        if target is None:
+            costs, end = level.unlocked_costs, leg[3]
+            if len(leg) > 4:
+                # The first step was made with the doors still locked
+                first = leg[4]
+                moves = moves_along(level, start, [first])
+                leg = (leg[0] - 1, leg[1] - level.locked_costs[first],
+                       leg[2] & ~self._bits.get(first, 0))
+                start = first
+        else:
+            costs, end = level.locked_costs, self._points[target]
+        for by_damage in (False, True):
+            best, parents = cheapest_paths(level, start, costs, by_damage)
+            if self._walk(parents, best, end) == leg[:3]:
+                break
+        moves += moves_along(level, start, path_to(parents, end))
+        if target is None:
+            moves += escape_move(level, end)
+        return moves
+
+    def _play(self, moves: str, start: PlayerState) \
+        -> Optional[tuple[list[str], PlayerState]]:
+        """ Plays the moves from the start of the level, inserting item uses
+            just before they are needed to survive.
+
+        Parameters:
+            moves: The move characters to play.
+            start: The state of the player at the start of the level.
+
+        Returns:
+            The commands played and the final state, or None if the player
+            loses anyway.
+        """
+        level = self._level
+        hp, hunger, thirst, inventory, num_moves = start
+        inventory = dict(inventory)
+        items = bytearray(level.items)
+        coins = items.count(COIN_CODE)
+        costs = level.locked_costs
+        cell = level.start
+        commands = []
+
+        def use(item_ids: tuple[str, ...]) -> int:
+            """ Uses the first held item of the given kinds, returning the
+                amount it changes its stat by, or 0 if none are held.
+            """
+            for item_id in item_ids:
+                name = ITEM_NAMES[item_id]
+                if inventory.get(name):
+                    inventory[name] -= 1
+                    if not inventory[name]:
+                        del inventory[name]
+                    commands.append(f'i {name}')
+                    return ITEM_AMOUNTS[item_id]
+            return 0
+
+        for move in moves:
+            target = level.neighbours[move][cell]
+            if target == ESCAPE:
+                commands.append(move)
+                continue
+            cost = costs[target]
+            if not cost:
+                # The game would ignore a blocked move, so the route is wrong
+                return None
+            tick = (num_moves + 1) % 5 == 0
+            while hp <= cost and (amount := use(tuple(HP_GAINS))):
+                hp = min(hp + amount, MAX_HEALTH)
+            while tick and hunger + 1 >= MAX_HUNGER \
+                and (amount := use(tuple(HUNGER_GAINS))):
+                hunger = max(hunger + amount, 0)
+            while tick and thirst + 1 >= MAX_THIRST \
+                and (amount := use(tuple(THIRST_GAINS))):
+                thirst = max(thirst + amount, 0)
+
+            commands.append(move)
+            num_moves += 1
+            if tick:
+                hunger, thirst = hunger + 1, thirst + 1
+            hp = max(hp - cost, 0)
+            cell = target
+            if items[cell]:
+                name = ITEM_NAMES[ITEM_IDS[items[cell]]]
+                inventory[name] = inventory.get(name, 0) + 1
+                coins -= items[cell] == COIN_CODE
+                items[cell] = 0
+            if not coins:
+                costs = level.unlocked_costs
+            if hp <= 0 or hunger >= MAX_HUNGER or thirst >= MAX_THIRST:
+                return None
+        return commands, PlayerState(hp, hunger, thirst, inventory, num_moves)
+
+    def solve(self, start: PlayerState = NEW_PLAYER) -> SurvivalResult:
+        """ Finds the surviving route which ends with the most HP.
+
+        Parameters:
+            start: The state of the player at the start of the level.
+        """
+        route = self._search(start)
+        if route is None:
+            return SurvivalResult(False, [], None)
+        moves = ''.join(self._leg_moves(*leg) for leg in route)
+        played = self._play(moves, start)
+        if played is None:
+            return SurvivalResult(False, [], None)
+        return SurvivalResult(True, *played)
+
+
+def survive_game(game_file: str) -> list[SurvivalResult]:
+    """ Finds a surviving route through each level of a game file in turn,
+        starting each level with the state the previous route ended in. The
+        route for each level keeps the most HP, which isn't always best for
+        the levels after it.
+
+    Parameters:
+        game_file: The file containing the levels for this game.
+
+    Returns:
+        The result for each level, stopping after the first level which can't
+        be survived.
+    """
+    results = []
+    state = NEW_PLAYER
+    for level in load_game(game_file):
+        result = ResourceSolver(level).solve(state)
+        results.append(result)
+        if not result.survivable:
+            break
+        state = result.final_state
+    return results
+
+
+def main():
+    """ Solves each given game file and reports the route for each level. """
+    parser = argparse.ArgumentParser(description='Solve MazeRunner levels')
+    parser.add_argument('game_files', nargs='+')
+    parser.add_argument('--survive', action='store_true',
+                        help='require routes which survive HP, hunger and '
+                             'thirst, keeping the most HP; only levels not '
+                             'in EXPECTED_UNSURVIVABLE fail')
+    args = parser.parse_args()
+
+    unsolvable = False
+    for game_file in args.game_files:
+        if args.survive:
+            name = os.path.basename(game_file)
+            for level_num, result in enumerate(survive_game(game_file),
+                                               start=1):
+                expected = (name, level_num) in EXPECTED_UNSURVIVABLE
+                if not result.survivable:
+                    unsolvable |= not expected
+                    print(f'{game_file} level {level_num}: unsurvivable'
+                          + (' (expected)' if expected else ''))
+                    continue
+                if expected:
+                    unsolvable = True
+                    print(f'{game_file} level {level_num}: survivable, but '
+                          f'listed in EXPECTED_UNSURVIVABLE')
+                hp, hunger, thirst, inventory, _ = result.final_state
+                print(f'{game_file} level {level_num}: HP {hp}, '
+                      f'hunger {hunger}, thirst {thirst}, '
+                      f'inventory {inventory}: '
+                      f"{', '.join(result.commands)}")
+            continue
+
+        for level_num, moves in enumerate(solve_game(game_file), start=1):
+            if moves is None:
+                unsolvable = True
+                print(f'{game_file} level {level_num}: unsolvable')
+            else:
+                print(f'{game_file} level {level_num}: {len(moves)} moves '
+                      f'{moves}')
+    raise SystemExit(1 if unsolvable else 0)
+
+
+if __name__ == '__main__':
+    main()
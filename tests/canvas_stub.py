@@ -0,0 +1,135 @@
+import weakref
+
+from a3 import ImageLevelView, LevelView, SpriteCache
+from constants import MAZE_HEIGHT, MAZE_WIDTH
+
+
+class Photo:
+    """ Stands in for ImageTk.PhotoImage, keeping the PIL image shown. """
+    def __init__(self, image):
+        self.image = image
+
+
+def _flatten(args):
+    coords = []
+    for arg in args:
+        if isinstance(arg, (tuple, list)):
+            coords.extend(arg)
+        else:
+            coords.append(arg)
+    return coords
+
+
+class StubCanvas:
+    """ Records the canvas items a level view draws, in stacking order,
+        rather than drawing them with Tk. Like Tk, it only refers to the
+        images shown weakly, so an image nothing else keeps is lost.
+    """
+    def __init__(self, dimensions, size=(MAZE_WIDTH, MAZE_HEIGHT)):
+        self.items = {}
+        self.order = [] # Bottom first
+        self.created = 0
+        self.scrollregion = None
+        self.view = (0.0, 0.0)
+        self._size = size
+        self._zoom = 1
+        self.set_dimensions(dimensions)
+
+    def _create(self, kind, args, options):
+        self.created += 1
+        if 'image' in options:
+            options['image'] = weakref.ref(options['image'])
+        self.items[self.created] = dict(kind=kind, coords=_flatten(args),
+                                        options=options)
+        self.order.append(self.created)
+        return self.created
+
+    def create_rectangle(self, *args, **options):
+        return self._create('rectangle', args, options)
+
+    def create_oval(self, *args, **options):
+        return self._create('oval', args, options)
+
+    def create_text(self, *args, **options):
+        return self._create('text', args, options)
+
+    def create_image(self, *args, **options):
+        return self._create('image', args, options)
+
+    def itemconfigure(self, item, **options):
+        if 'image' in options:
+            options['image'] = weakref.ref(options['image'])
+        self.items[item]['options'].update(options)
+
+    def _tagged(self, tag):
+        return [item for item in self.order
+                if self.items[item]['options'].get('tags') == tag]
+
+    def move(self, tag, dx, dy):
+        for item in self._tagged(tag):
+            coords = self.items[item]['coords']
+            coords[:] = [value + (dy if index % 2 else dx)
+                         for index, value in enumerate(coords)]
+
+    def tag_raise(self, tag):
+        for item in self._tagged(tag):
+            self.order.remove(item)
+            self.order.append(item)
+
+    def tag_lower(self, item):
+        self.order.remove(item)
+        self.order.insert(0, item)
+
+    def delete(self, *items):
+        if items == ('all',):
+            items = tuple(self.items)
+        for item in items:
+            del self.items[item]
+            self.order.remove(item)
+
+    def configure(self, scrollregion=None, **options):
+        self.scrollregion = scrollregion
+
+    def xview_moveto(self, fraction):
+        self.view = (fraction, self.view[1])
+
+    def yview_moveto(self, fraction):
+        self.view = (self.view[0], fraction)
+
+    def get_view_origin(self):
+        """ Returns the (x, y) pixel at the top left of the view. """
+        return (round(self.view[0] * self.scrollregion[2]),
+                round(self.view[1] * self.scrollregion[3]))
+
+    def shown_image(self, item):
+        """ Returns the PIL image an image item shows, or None if the image
+            has been lost.
+        """
+        photo = self.items[item]['options']['image']()
+        return None if photo is None else photo.image
+
+    def scene(self):
+        """ Returns what the canvas shows, bottom first, for comparing. """
+        scene = []
+        for item in self.order:
+            options = dict(self.items[item]['options'])
+            if 'image' in options:
+                image = self.shown_image(item)
+                options['image'] = None if image is None \
+                    else (image.mode, image.size, image.tobytes())
+            scene.append((self.items[item]['kind'],
+                          self.items[item]['coords'],
+                          sorted(options.items(), key=repr)))
+        return scene
+
+
+class StubLevelView(StubCanvas, LevelView):
+    pass
+
+
+class StubImageLevelView(StubCanvas, ImageLevelView):
+    def __init__(self, dimensions, size=(MAZE_WIDTH, MAZE_HEIGHT),
+                 sprites=None):
+        self._sprites = SpriteCache() if sprites is None else sprites
+        self._live_sprites = dict()
+        super().__init__(dimensions, size)
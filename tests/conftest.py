@@ -0,0 +1,16 @@
+import os
+import types
+
+import pytest
+
+import a3
+from canvas_stub import Photo
+
+
+@pytest.fixture
+def stub_photos(monkeypatch):
+    """ Lets the level views make PhotoImages without a display, and runs
+        from the repository root where the sprites are.
+    """
+    monkeypatch.setattr(a3, 'ImageTk', types.SimpleNamespace(PhotoImage=Photo))
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(__file__)))
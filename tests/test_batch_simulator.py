@@ -0,0 +1,23 @@
+import glob
+import os
+
+import pytest
+
+from batch_simulator import check_against_model
+
+GAMES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'games')
+GAME_FILES = sorted(glob.glob(os.path.join(GAMES_DIR, '*.txt')))
+
+
+@pytest.mark.parametrize('game_file', GAME_FILES, ids=os.path.basename)
+@pytest.mark.parametrize('seed', range(3))
+def test_random_batches_match_model(game_file, seed):
+    assert check_against_model(game_file, num_games=200, length=300,
+                               seed=seed) == []
+
+
+@pytest.mark.parametrize('game_file', GAME_FILES, ids=os.path.basename)
+def test_short_batches_match_model(game_file):
+    # Short games end mid-level, checking the state before any outcome
+    assert check_against_model(game_file, num_games=500, length=20,
+                               seed=7) == []
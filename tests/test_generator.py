@@ -0,0 +1,24 @@
+import pytest
+
+from generator import write_game
+from solver import LevelSolver
+from a2_solution import load_game
+
+
+@pytest.mark.parametrize('num_rows', range(3, 13))
+@pytest.mark.parametrize('num_cols', range(3, 13))
+def test_small_levels_can_be_finished(tmp_path, num_rows, num_cols):
+    if num_rows < 5 and num_cols == 3:
+        pytest.skip('too small to generate')
+    filename = str(tmp_path / 'game.txt')
+    write_game(filename, num_rows, num_cols, num_levels=5, seed=num_rows)
+    for level in load_game(filename):
+        assert list(level.get_dimensions()) == [num_rows, num_cols]
+        assert LevelSolver(level).solve() is not None
+
+
+@pytest.mark.parametrize('num_rows, num_cols',
+                         [(3, 3), (4, 3), (2, 10), (10, 2)])
+def test_unfinishable_sizes_are_rejected(tmp_path, num_rows, num_cols):
+    with pytest.raises(ValueError):
+        write_game(str(tmp_path / 'game.txt'), num_rows, num_cols)
@@ -0,0 +1,53 @@
+import builtins
+import os
+import time
+
+import pytest
+
+import instrumentation
+from a2_solution import MazeRunner, Model, MOVE_DELTAS, TextInterface
+from solver import solve_game
+
+GAME_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                         'games', 'game1.txt')
+
+
+@pytest.fixture
+def hooks():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_blocked_moves_are_not_counted(hooks):
+    model = Model(GAME_FILE)
+    for _ in range(5):
+        model.move_player(MOVE_DELTAS['a'])
+    assert model.get_num_moves() == 0
+    assert instrumentation.snapshot()['counters']['moves'] == 0
+
+
+def test_winning_completes_the_last_level(hooks):
+    model = Model(GAME_FILE)
+    moves = ''.join(solve_game(GAME_FILE))
+    for move in moves:
+        model.move_player(MOVE_DELTAS[move])
+    assert model.has_won()
+    counters = instrumentation.snapshot()['counters']
+    assert counters['moves'] == len(moves)
+    assert counters['levels_completed'] == 2
+
+
+def test_reprompt_wait_is_not_timed(hooks, monkeypatch, capsys):
+    def slow_input(prompt=''):
+        time.sleep(0.05)
+        return 'd'
+
+    monkeypatch.setattr(builtins, 'input', slow_input)
+    runner = MazeRunner(GAME_FILE, TextInterface())
+    runner._handle_move('not a move')
+    summary = instrumentation.snapshot()['phases']['input']
+    assert summary['count'] == 2
+    assert summary['max_us'] < 50000
@@ -0,0 +1,378 @@
+import gc
+import os
+
+import numpy as np
+import pytest
+from PIL import ImageColor
+
+from a2_solution import (APPLE, CAMERA_MARGIN, COIN, DOOR, EMPTY, MAX_ZOOM,
+                         MOVE_DELTAS, TILE_COLOURS, Model)
+from a3 import SpriteCache
+from canvas_stub import StubImageLevelView, StubLevelView
+from generator import write_game
+from solver import solve_game
+
+GAMES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'games')
+
+
+def draw(view, model):
+    view.update(model.get_current_maze(), model.get_current_items(),
+                model.get_player().get_position())
+
+
+def test_shown_sprites_outlive_eviction(stub_photos):
+    model = Model(os.path.join(GAMES_DIR, 'game3.txt'))
+    sprites = SpriteCache(max_sprites=1)
+    view = StubImageLevelView(model.get_current_maze().get_dimensions(),
+                              sprites=sprites)
+    draw(view, model)
+    gc.collect()
+
+    images = [item for item in view.order
+              if view.items[item]['kind'] == 'image']
+    assert len({view.items[item]['options']['image']()
+                for item in images}) > 2
+    assert len(sprites) == 1
+    for item in images:
+        assert view.shown_image(item) is not None
+
+
+def snapshot(view):
+    return {item: (details['kind'], list(details['coords']),
+                   dict(details['options']))
+            for item, details in view.items.items()}
+
+
+def changes(before, after):
+    """ Returns the canvas items created, deleted and changed between two
+        snapshots.
+    """
+    created = after.keys() - before.keys()
+    deleted = before.keys() - after.keys()
+    changed = {item for item in before.keys() & after.keys()
+               if before[item] != after[item]}
+    return created, deleted, changed
+
+
+def assert_matches_full_redraw(view, model, view_class):
+    fresh = view_class(model.get_current_maze().get_dimensions())
+    draw(fresh, model)
+    assert sorted(view.scene(), key=repr) == sorted(fresh.scene(), key=repr)
+    # The tiles are at the bottom and the player is on top
+    assert view.scene()[0] == fresh.scene()[0]
+    assert view.scene()[-1] == fresh.scene()[-1]
+
+
+@pytest.mark.parametrize('view_class', [StubLevelView, StubImageLevelView])
+def test_updates_only_change_what_changed(stub_photos, view_class):
+    model = Model(os.path.join(GAMES_DIR, 'game1.txt'))
+    view = view_class(model.get_current_maze().get_dimensions())
+    draw(view, model)
+    player = set(view._player_ids)
+
+    def step(action):
+        before = snapshot(view)
+        action()
+        draw(view, model)
+        assert_matches_full_redraw(view, model, view_class)
+        return changes(before, snapshot(view))
+
+    # A blocked move changes nothing
+    assert step(lambda: model.move_player(MOVE_DELTAS['w'])) \
+        == (set(), set(), set())
+
+    # A move only moves the player
+    assert step(lambda: model.move_player(MOVE_DELTAS['d'])) \
+        == (set(), set(), player)
+
+    # Collecting a coin deletes just that coin
+    coin = set(view._item_ids[(3, 2)])
+    assert step(lambda: model.move_player(MOVE_DELTAS['d'])) \
+        == (set(), coin, player)
+
+    # Undo draws the coin again and moves the player back
+    created, deleted, changed = step(model.undo)
+    assert len(created) == len(coin) and not deleted and changed == player
+    coin = created
+
+    # Redo deletes it again
+    assert step(model.redo) == (set(), coin, player)
+
+    # Unlocking the door also shows the tiles again with the door open
+    step(lambda: model.move_player(MOVE_DELTAS['w']))
+    coin = set(view._item_ids[(1, 2)])
+    before = snapshot(view)
+    model.move_player(MOVE_DELTAS['w'])
+    draw(view, model)
+    assert_matches_full_redraw(view, model, view_class)
+    created, deleted, changed = changes(before, snapshot(view))
+    assert model.get_current_maze().is_unlocked()
+    assert not created and len(deleted) == len(coin)
+    assert changed == player | {view._tile_layer_id}
+
+
+@pytest.mark.parametrize('view_class', [StubLevelView, StubImageLevelView])
+def test_undo_and_redo_across_levels(stub_photos, view_class):
+    game_file = os.path.join(GAMES_DIR, 'game1.txt')
+    model = Model(game_file)
+    view = view_class(model.get_current_maze().get_dimensions())
+    draw(view, model)
+    for move in solve_game(game_file)[0]:
+        model.move_player(MOVE_DELTAS[move])
+        draw(view, model)
+    assert model.get_level_num() == 1
+
+    for action in (model.undo, model.redo, model.undo):
+        action()
+        draw(view, model)
+        assert_matches_full_redraw(view, model, view_class)
+    assert model.get_level_num() == 0
+
+
+def tile_grid(game_file):
+    maze = Model(game_file).get_current_maze()
+    rows, cols = maze.get_dimensions()
+    tile_ids = bytes(maze.get_window(0, 0, rows, cols).replace(b'\n', b''))
+    return tile_ids, (rows, cols)
+
+
+def cell_box(position, cell_size):
+    (row, col), (width, height) = position, cell_size
+    return (col * width, row * height, (col + 1) * width, (row + 1) * height)
+
+
+def test_composed_sprites_match_each_tile(stub_photos):
+    tile_ids, (rows, cols) = tile_grid(os.path.join(GAMES_DIR, 'game3.txt'))
+    view = StubImageLevelView((rows, cols))
+    cell_size = view.get_cell_size()
+    layer = view._compose_tiles(tile_ids, (rows, cols))
+    assert layer.size == (cols * cell_size[0], rows * cell_size[1])
+    sprites = SpriteCache()
+    for row in range(rows):
+        for col in range(cols):
+            ID = chr(tile_ids[row * cols + col])
+            cell = layer.crop(cell_box((row, col), cell_size))
+            assert cell.tobytes() \
+                == sprites.get_scaled(ID, cell_size).tobytes(), (row, col)
+
+    # Painting a tile replaces just that cell's sprite
+    view._tile_layer = layer.copy()
+    view._chunk = (0, 0, rows, cols)
+    door = tile_ids.index(ord(DOOR))
+    position = divmod(door, cols)
+    view._paint_tile(position, EMPTY)
+    painted = view._tile_layer
+    assert painted.crop(cell_box(position, cell_size)).tobytes() \
+        == sprites.get_scaled(EMPTY, cell_size).tobytes()
+    painted.paste(layer.crop(cell_box(position, cell_size)),
+                  cell_box(position, cell_size)[:2])
+    assert painted.tobytes() == layer.tobytes()
+
+
+def test_composed_rectangles_match_each_tile():
+    tile_ids, (rows, cols) = tile_grid(os.path.join(GAMES_DIR, 'game3.txt'))
+    view = StubLevelView((rows, cols))
+    width, height = view.get_cell_size()
+    layer = view._compose_tiles(tile_ids, (rows, cols)).convert('RGB')
+    assert layer.size == (cols * width + 1, rows * height + 1)
+    black = (0, 0, 0)
+    for row in range(rows):
+        for col in range(cols):
+            colour = ImageColor.getrgb(TILE_COLOURS[chr(
+                tile_ids[row * cols + col])])
+            x, y = col * width, row * height
+            # Filled with the tile's colour inside a black outline
+            assert layer.getpixel((x + 1, y + 1)) == colour
+            assert layer.getpixel((x + width - 1, y + height - 1)) == colour
+            assert layer.getpixel((x, y + height // 2)) == black
+            assert layer.getpixel((x + width // 2, y)) == black
+            assert layer.getpixel((x + width, y + height)) == black
+            cell = layer.crop((x + 1, y + 1, x + width, y + height))
+            assert cell.getcolors() == [((width - 1) * (height - 1), colour)]
+
+
+def walk(start, end):
+    """ Yields the cells along a straight line of cells, after the start. """
+    (row, col), (end_row, end_col) = start, end
+    while (row, col) != (end_row, end_col):
+        row += (end_row > row) - (end_row < row)
+        col += (end_col > col) - (end_col < col)
+        yield row, col
+
+
+def check_camera(view, items, position):
+    rows, cols = view._block_dimensions
+    cell_width, cell_height = view.get_cell_size()
+    width, height = view._size
+    max_x, max_y = cols * cell_width - width, rows * cell_height - height
+
+    # Centred on the player, but clamped to the edges of the maze
+    x, y = view._camera
+    assert view.get_view_origin() == (x, y)
+    assert 0 <= x <= max_x and 0 <= y <= max_y
+    centre_x = position[1] * cell_width + (cell_width - width) // 2
+    centre_y = position[0] * cell_height + (cell_height - height) // 2
+    assert x == max(0, min(centre_x, max_x))
+    assert y == max(0, min(centre_y, max_y))
+
+    # The chunk covers the view, and is at most CAMERA_MARGIN cells bigger
+    # each way
+    top, left, num_rows, num_cols = view._chunk
+    assert top * cell_height <= y and left * cell_width <= x
+    assert (top + num_rows) * cell_height >= min(rows * cell_height,
+                                                  y + height)
+    assert (left + num_cols) * cell_width >= min(cols * cell_width, x + width)
+    assert num_rows <= height // cell_height + 2 + 2 * CAMERA_MARGIN
+    assert num_cols <= width // cell_width + 2 + 2 * CAMERA_MARGIN
+
+    # The tile layer shows the chunk, and only the chunk's items are drawn
+    layer = view.items[view._tile_layer_id]
+    assert layer['coords'] == [left * cell_width, top * cell_height]
+    assert view.shown_image(view._tile_layer_id).size[:2] \
+        >= (num_cols * cell_width, num_rows * cell_height)
+    in_chunk = {key for key in items if view._in_chunk(key)}
+    assert view._item_ids.keys() == in_chunk
+    assert len(view.items) == 1 + len(view._player_ids) \
+        + sum(len(ids) for ids in view._item_ids.values())
+
+
+def chunk_around(view):
+    """ Returns the chunk to draw around the view. """
+    rows, cols = view._block_dimensions
+    cell_width, cell_height = view.get_cell_size()
+    width, height = view._size
+    x, y = view._camera
+    top = max(0, y // cell_height - CAMERA_MARGIN)
+    left = max(0, x // cell_width - CAMERA_MARGIN)
+    bottom = min(rows, (y + height) // cell_height + 1 + CAMERA_MARGIN)
+    right = min(cols, (x + width) // cell_width + 1 + CAMERA_MARGIN)
+    return top, left, bottom - top, right - left
+
+
+@pytest.mark.parametrize('view_class', [StubLevelView, StubImageLevelView])
+def test_camera_follows_the_player_to_each_edge(stub_photos, tmp_path,
+                                                view_class):
+    game_file = str(tmp_path / 'game.txt')
+    write_game(game_file, 121, 95, content={COIN: 0.2, APPLE: 0.1})
+    model = Model(game_file)
+    maze, items = model.get_current_maze(), model.get_current_items()
+    rows, cols = maze.get_dimensions()
+    view = view_class((rows, cols))
+    centre = (rows // 2, cols // 2)
+    view.update(maze, items, centre)
+    assert view._scrolling
+    check_camera(view, items, centre)
+
+    edges = [(0, cols // 2), (rows - 1, cols // 2), (rows // 2, 0),
+             (rows // 2, cols - 1), (0, 0), (rows - 1, cols - 1)]
+    for edge in edges:
+        chunks = {view._chunk}
+        steps = 0
+        for position in [*walk(centre, edge), *walk(edge, centre)]:
+            chunk = view._chunk
+            view.update(maze, items, position)
+            check_camera(view, items, position)
+            if view._chunk != chunk:
+                # A new chunk is the cells in view and CAMERA_MARGIN more
+                assert view._chunk == chunk_around(view)
+            chunks.add(view._chunk)
+            steps += 1
+        # Chunks are only drawn again after the view moves CAMERA_MARGIN
+        # cells, and the camera stops moving at the edges
+        assert 2 < len(chunks) <= steps // CAMERA_MARGIN + 2
+
+        # At the edge the camera is clamped to the maze
+        view.update(maze, items, edge)
+        x, y = view._camera
+        cell_width, cell_height = view.get_cell_size()
+        width, height = view._size
+        if edge[0] == 0:
+            assert y == 0
+        if edge[0] == rows - 1:
+            assert y == rows * cell_height - height
+        if edge[1] == 0:
+            assert x == 0
+        if edge[1] == cols - 1:
+            assert x == cols * cell_width - width
+        view.update(maze, items, centre)
+
+
+def test_small_mazes_do_not_scroll(stub_photos):
+    model = Model(os.path.join(GAMES_DIR, 'game1.txt'))
+    view = StubLevelView(model.get_current_maze().get_dimensions())
+    draw(view, model)
+    assert not view._scrolling and view._camera == (0, 0)
+    rows, cols = model.get_current_maze().get_dimensions()
+    assert view._chunk == (0, 0, rows, cols)
+    model.move_player(MOVE_DELTAS['d'])
+    draw(view, model)
+    assert view._camera == (0, 0) and view._chunk == (0, 0, rows, cols)
+
+
+def reference_blocks(view, maze):
+    """ Returns the colours the zoomed out chunk should show, one per block,
+        each the rounded mean colour of the block's tiles.
+    """
+    rows, cols = maze.get_dimensions()
+    colours = np.zeros((256, 3), np.int64)
+    for ID, colour in TILE_COLOURS.items():
+        colours[ord(ID)] = ImageColor.getrgb(colour)
+    pixels = colours[np.frombuffer(bytes(maze.get_codes()), np.uint8)
+                     .reshape(rows, cols)]
+    block = view._block
+    top, left, num_rows, num_cols = view._chunk
+    cells = pixels[top * block:(top + num_rows) * block,
+                   left * block:(left + num_cols) * block]
+    counts = np.ones(cells.shape[:2] + (1,), np.int64)
+    starts = (np.arange(0, cells.shape[0], block),
+              np.arange(0, cells.shape[1], block))
+    sums, counts = (np.add.reduceat(np.add.reduceat(array, starts[0], axis=0),
+                                    starts[1], axis=1)
+                    for array in (cells, counts))
+    expected = (sums + counts // 2) // counts
+    return expected
+
+
+@pytest.mark.parametrize('view_class', [StubLevelView, StubImageLevelView])
+@pytest.mark.parametrize('dimensions', [(101, 103), (201, 204), (9, 301)])
+def test_zoomed_out_edge_chunks(stub_photos, tmp_path, view_class,
+                                dimensions):
+    game_file = str(tmp_path / 'game.txt')
+    write_game(game_file, *dimensions, seed=sum(dimensions))
+    model = Model(game_file)
+    maze, items = model.get_current_maze(), model.get_current_items()
+    rows, cols = dimensions
+    view = view_class(dimensions)
+    corners = [(0, 0), (0, cols - 1), (rows - 1, 0), (rows - 1, cols - 1)]
+    zoom = 1
+    while zoom <= MAX_ZOOM:
+        view.set_zoom(zoom)
+        for position in corners:
+            view.update(maze, items, position)
+            if zoom == 1:
+                continue
+            # The blocks at the edges may be cut short, but are still the
+            # mean of their tiles, give or take rounding
+            cell_width, cell_height = view.get_cell_size()
+            expected = reference_blocks(view, maze)
+            expected = expected.repeat(cell_height, axis=0) \
+                .repeat(cell_width, axis=1)
+            layer = np.asarray(view.shown_image(view._tile_layer_id)
+                               .convert('RGB'), np.int64)
+            assert layer.shape == expected.shape
+            assert np.abs(layer - expected).max() <= 1, (zoom, position)
+        zoom *= 2
+
+
+@pytest.mark.parametrize('view_class', [StubLevelView, StubImageLevelView])
+def test_unchanged_zoom_keeps_the_drawing(stub_photos, view_class):
+    model = Model(os.path.join(GAMES_DIR, 'game2.txt'))
+    view = view_class(model.get_current_maze().get_dimensions())
+    for zoom, same in [(1, 0), (4, 4), (MAX_ZOOM, MAX_ZOOM * 2)]:
+        view.set_zoom(zoom)
+        draw(view, model)
+        created, scene = view.created, view.scene()
+        view.set_zoom(same)
+        draw(view, model)
+        assert view.get_zoom() == zoom
+        assert view.created == created and view.scene() == scene
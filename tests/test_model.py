@@ -0,0 +1,34 @@
+import os
+
+from a2_solution import Model, MOVE_DELTAS
+from solver import solve_game
+
+GAME_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                         'games', 'game1.txt')
+
+
+def play(model, moves):
+    for move in moves:
+        model.move_player(MOVE_DELTAS[move])
+
+
+def test_moves_after_winning_are_ignored():
+    model = Model(GAME_FILE)
+    play(model, ''.join(solve_game(GAME_FILE)))
+    assert model.has_won()
+    level_num, num_moves = model.get_level_num(), model.get_num_moves()
+    position = model.get_player().get_position()
+
+    play(model, 'wasdwasd')
+    assert model.has_won()
+    assert model.get_level_num() == level_num
+    assert model.get_num_moves() == num_moves
+    assert model.get_player().get_position() == position
+
+    # Only the winning escape is undone, back onto the last level
+    assert model.undo()
+    assert not model.has_won()
+    assert model.get_level_num() == level_num - 1
+    assert model.redo()
+    assert model.has_won()
+    assert model.get_level_num() == level_num
@@ -0,0 +1,50 @@
+import builtins
+import os
+import sys
+
+from a2_solution import TextInterface, ViewportTextInterface
+import replay
+from replay import Replay, record_game, verify_replay
+from solver import solve_game
+
+GAME_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                         'games', 'game1.txt')
+
+
+class CountingInterface(TextInterface):
+    def __init__(self):
+        super().__init__()
+        self.frames = 0
+
+    def draw(self, *args):
+        self.frames += 1
+        super().draw(*args)
+
+
+def record(monkeypatch, tmp_path, view=None):
+    moves = iter(''.join(solve_game(GAME_FILE)))
+    monkeypatch.setattr(builtins, 'input', lambda prompt='': next(moves))
+    filename = str(tmp_path / 'game.rpl')
+    record_game(GAME_FILE, filename, view)
+    return Replay(filename)
+
+
+def test_records_through_the_given_view(monkeypatch, tmp_path):
+    view = CountingInterface()
+    replay = record(monkeypatch, tmp_path, view)
+    assert view.frames == len(replay)
+    assert verify_replay(replay).won
+
+
+def test_records_through_the_same_view_as_the_game(monkeypatch, tmp_path):
+    views = []
+
+    class Runner(replay.MazeRunner):
+        def __init__(self, game_file, view):
+            views.append(view)
+            super().__init__(game_file, view)
+
+    monkeypatch.setattr(replay, 'MazeRunner', Runner)
+    monkeypatch.setattr(sys.stdout, 'isatty', lambda: True)
+    record(monkeypatch, tmp_path)
+    assert type(views[0]) is ViewportTextInterface
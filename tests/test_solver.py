@@ -0,0 +1,48 @@
+import glob
+import os
+import sys
+
+import pytest
+
+import solver
+from engine import HeadlessEngine, USE_KEY
+
+GAMES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'games')
+GAME_FILES = sorted(glob.glob(os.path.join(GAMES_DIR, '*.txt')))
+ITEM_IDS_BY_NAME = {name: item_id
+                    for item_id, name in solver.ITEM_NAMES.items()}
+
+
+def to_moves(commands):
+    """ Converts MazeRunner commands into HeadlessEngine moves. """
+    return ''.join(
+        command if len(command) == 1
+        else USE_KEY + ITEM_IDS_BY_NAME[command.partition(' ')[-1]]
+        for command in commands
+    )
+
+
+@pytest.mark.parametrize('game_file', GAME_FILES, ids=os.path.basename)
+def test_every_level_is_solvable(game_file):
+    assert None not in solver.solve_game(game_file)
+
+
+@pytest.mark.parametrize('game_file', GAME_FILES, ids=os.path.basename)
+def test_survivable_routes_win(game_file):
+    name = os.path.basename(game_file)
+    results = solver.survive_game(game_file)
+    for level_num, result in enumerate(results, start=1):
+        expected = (name, level_num) in solver.EXPECTED_UNSURVIVABLE
+        assert result.survivable != expected, level_num
+    if all(result.survivable for result in results):
+        moves = ''.join(to_moves(result.commands) for result in results)
+        assert HeadlessEngine(game_file).run(moves).won
+
+
+def test_survive_check_passes_on_games(monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['solver.py', '--survive'] + GAME_FILES)
+    with pytest.raises(SystemExit) as exit_info:
+        solver.main()
+    assert exit_info.value.code == 0
+    assert capsys.readouterr().out.count('unsurvivable (expected)') \
+        == len(solver.EXPECTED_UNSURVIVABLE)